@@ -3,6 +3,10 @@ from dotenv import load_dotenv
 from snowflake.snowpark import Session
 from snowflake.cortex import Summarize, Complete, ExtractAnswer, Sentiment, Translate
 
+from chunked_summary import map_reduce_summarize
+from llm_cache import LLM_CACHE
+from task_runner import format_report, run_concurrently
+
 
 # Load environment variables from .env
 load_dotenv()
@@ -19,15 +23,26 @@ snowflake_session = Session.builder.configs(connection_params).create()
 
 # Define the LLM functions
 def summarize(user_text):
-    summary = Summarize(text=user_text, session=snowflake_session)
+    summary = LLM_CACHE.cached_call(
+        "cortex-summarize", user_text, lambda: Summarize(text=user_text, session=snowflake_session)
+    )
     return summary
 
 
-def complete(user_text):
-    completion = Complete(
-        model="snowflake-arctic",
-        prompt=f"Provide 5 keywords from the following text: {user_text}",
-        session=snowflake_session,
+def summarize_long(user_text, chunk_tokens=None, max_workers=None):
+    # Summarizes chunks in parallel and then the partial summaries, for texts beyond one call's context
+    options = {}
+    if chunk_tokens:
+        options["max_tokens"] = chunk_tokens
+    if max_workers:
+        options["max_workers"] = max_workers
+    return map_reduce_summarize(user_text, summarize, **options)
+
+
+def complete(user_text, model="snowflake-arctic"):
+    prompt = f"Provide 5 keywords from the following text: {user_text}"
+    completion = LLM_CACHE.cached_call(
+        model, prompt, lambda: Complete(model=model, prompt=prompt, session=snowflake_session)
     )
     return completion
 
@@ -47,8 +62,12 @@ def sentiment(user_text):
 
 
 def translate(user_text):
-    translation = Translate(
-        text=user_text, from_language="en", to_language="de", session=snowflake_session
+    translation = LLM_CACHE.cached_call(
+        "cortex-translate",
+        user_text,
+        lambda: Translate(text=user_text, from_language="en", to_language="de", session=snowflake_session),
+        from_language="en",
+        to_language="de",
     )
     return translation
 
@@ -66,30 +85,24 @@ def main():
     """
 
     try:
-        summary_result = summarize(user_text)
-        print(
-            f"Summarize() Snowflake Cortex LLM function result:\n{summary_result.strip()}\n"
+        # The five calls are independent, so run them concurrently
+        outcomes, wall_seconds = run_concurrently(
+            {
+                "Summarize": lambda: summarize_long(user_text),
+                "Complete": lambda: complete(user_text).strip(),
+                "ExtractAnswer": lambda: extract_answer(user_text),
+                "Sentiment": lambda: sentiment(user_text),
+                "Translate": lambda: translate(user_text).strip(),
+            }
         )
 
-        completion_result = complete(user_text)
-        print(
-            f"Complete() Snowflake Cortex LLM function result:\n{completion_result.strip()}\n"
-        )
+        for name, outcome in outcomes.items():
+            if outcome["status"] == "ok":
+                print(f"{name}() Snowflake Cortex LLM function result:\n{outcome['result']}\n")
+            else:
+                print(f"{name}() Snowflake Cortex LLM function failed ({outcome['status']}): {outcome['error']}\n")
 
-        answer_result = extract_answer(user_text)
-        print(
-            f"ExtractAnswer() Snowflake Cortex LLM function result:\n{answer_result}\n"
-        )
-
-        sentiment_result = sentiment(user_text)
-        print(
-            f"Sentiment() Snowflake Cortex LLM function result:\n{sentiment_result}\n"
-        )
-
-        translation_result = translate(user_text)
-        print(
-            f"Translate() Snowflake Cortex LLM function result:\n{translation_result.strip()}\n"
-        )
+        print(format_report(outcomes, wall_seconds))
 
     finally:
         if snowflake_session:
@@ -0,0 +1,103 @@
+import pandas as pd
+import streamlit as st
+
+from analyst_client import ANALYST_CLIENT
+from connection_pool import POOL
+from insight_cache import INSIGHT_CACHE
+from llm_cache import LLM_CACHE
+from local_replica import ROUTER
+from result_cache import RESULT_CACHE
+from semantic_cache import SEMANTIC_CACHE
+from tracing import TRACER, TRACE_EXPORT, TRACE_PATH
+from verified_queries import VERIFIED_QUERIES
+
+
+def _hit_rate(hits: int, misses: int) -> str:
+    return f"{hits / (hits + misses):.0%}" if hits + misses else "-"
+
+
+def show_admin_panel() -> None:
+    """Shows rolling stage latencies from the tracer and the hit rates of every cache in the sidebar."""
+    with st.sidebar.expander("Admin", expanded=False):
+        stats = TRACER.stats()
+        if stats:
+            st.markdown("**Stage latency** (recent spans)")
+            st.dataframe(
+                pd.DataFrame(
+                    [
+                        {
+                            "stage": name,
+                            "count": span["count"],
+                            "errors": span["errors"],
+                            "p50 ms": round(span["p50_seconds"] * 1000, 1),
+                            "p95 ms": round(span["p95_seconds"] * 1000, 1),
+                        }
+                        for name, span in sorted(stats.items())
+                    ]
+                ).set_index("stage")
+            )
+        else:
+            st.caption("No spans recorded yet.")
+
+        caches = [
+            ("result", RESULT_CACHE.stats()),
+            ("llm response", LLM_CACHE.stats()),
+            ("insight", INSIGHT_CACHE.stats()),
+            ("semantic", SEMANTIC_CACHE.stats()),
+            ("verified queries", VERIFIED_QUERIES.stats()),
+        ]
+        st.markdown("**Cache hit rates**")
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {
+                        "cache": name,
+                        "hits": cache["hits"],
+                        "misses": cache["misses"],
+                        "hit rate": _hit_rate(cache["hits"], cache["misses"]),
+                    }
+                    for name, cache in caches
+                ]
+            ).set_index("cache")
+        )
+
+        analyst = ANALYST_CLIENT.stats()
+        pool = POOL.stats()
+        st.caption(
+            f"Analyst: {analyst['calls']} calls, p50 {analyst['p50_seconds']:.1f} s, "
+            f"p95 {analyst['p95_seconds']:.1f} s, {analyst['retries']} retries, {analyst['errors']} errors"
+        )
+        st.caption(
+            f"Connections: {pool['size']}/{pool['max_size']}, {pool['timeouts']} timeouts, "
+            f"max wait {pool['max_wait_seconds'] * 1000:.0f} ms"
+        )
+        routing = ROUTER.stats()
+        replica = ROUTER.replica.stats()
+        st.caption(
+            f"Queries: {routing['replica']['queries']} on the local replica "
+            f"(p50 {routing['replica']['p50_seconds'] * 1000:.0f} ms), "
+            f"{routing['snowflake']['queries']} on Snowflake (p50 {routing['snowflake']['p50_seconds'] * 1000:.0f} ms)"
+        )
+        if not ROUTER.enabled:
+            st.caption("Local replica disabled.")
+        elif replica["error"]:
+            st.caption(f"Replica refresh failed: {replica['error']}")
+        elif replica["ready"]:
+            st.caption(f"Replica refreshed {replica['refreshed_at']:%Y-%m-%d %H:%M} UTC, rows {replica['rows']}")
+        decisions = ROUTER.recent()
+        if decisions:
+            st.dataframe(
+                pd.DataFrame(
+                    [
+                        {
+                            "ran on": decision["target"],
+                            "ms": round(decision["seconds"] * 1000, 1),
+                            "reason": decision["reason"],
+                            "statement": " ".join(decision["statement"].split())[:80],
+                        }
+                        for decision in reversed(decisions)
+                    ]
+                )
+            )
+        if TRACE_EXPORT:
+            st.caption(f"Spans are written to {TRACE_PATH}")
@@ -0,0 +1,303 @@
+import json
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from connection_pool import POOL
+from conn_config import config_dict as cfg
+from tracing import TRACER
+
+
+HOST = cfg["host"]
+DATABASE = cfg["database"]
+SCHEMA = cfg["schema"]
+STAGE = cfg["stage"]
+FILE = cfg["file"]
+# None talks to Snowflake; set e.g. http://localhost:8765 to use mock_analyst_server.py
+BASE_URL = cfg["analyst_base_url"] or f"https://{HOST}"
+
+CONNECT_TIMEOUT = cfg["analyst_connect_timeout"]
+READ_TIMEOUT = cfg["analyst_read_timeout"]
+MAX_RETRIES = cfg["analyst_max_retries"]
+BACKOFF_BASE = cfg["analyst_backoff_base"]
+BACKOFF_MAX = cfg["analyst_backoff_max"]
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+MESSAGE_PATH = "/api/v2/cortex/analyst/message"
+
+
+class AnalystError(Exception):
+    """Raised when the Cortex Analyst API returns an error response."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, request_id: Optional[str] = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.request_id = request_id
+
+
+def user_message(prompt: str) -> Dict[str, Any]:
+    """Builds a single user turn for the Analyst messages list."""
+    return {"role": "user", "content": [{"type": "text", "text": prompt}]}
+
+
+class AnalystClient:
+    """Client for the Cortex Analyst message endpoint.
+
+    Reuses pooled keep-alive HTTPS connections, applies connect/read timeouts,
+    retries throttled and server errors with jittered exponential backoff and
+    keeps per-call latency metrics.
+    """
+
+    def __init__(
+        self,
+        token: Callable[[], str] = POOL.token,
+        refresh_token: Optional[Callable[[], str]] = POOL.refresh_token,
+        base_url: str = BASE_URL,
+        semantic_model_file: str = f"@{DATABASE}.{SCHEMA}.{STAGE}/{FILE}",
+        timeout: tuple = (CONNECT_TIMEOUT, READ_TIMEOUT),
+        max_retries: int = MAX_RETRIES,
+        pool_maxsize: int = 16,
+        history_size: int = 500,
+    ) -> None:
+        self._token = token
+        self._refresh_token = refresh_token
+        self.base_url = base_url.rstrip("/")
+        self.semantic_model_file = semantic_model_file
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self.calls: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f'Snowflake Token="{self._token()}"',
+            "Content-Type": "application/json",
+        }
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: Optional[str] = None) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when given."""
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX)
+            except ValueError:
+                pass
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+    def post(self, request_body: Dict[str, Any], stream: bool = False) -> Tuple[requests.Response, int]:
+        """Posts a request body to the message endpoint, retrying transient failures.
+
+        Returns the response and the number of attempts it took.
+        """
+        url = f"{self.base_url}{MESSAGE_PATH}"
+        start = time.perf_counter()
+        attempt = 0
+        refreshed = False
+
+        while True:
+            try:
+                resp = self.session.post(
+                    url, json=request_body, headers=self._headers(), timeout=self.timeout, stream=stream
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    self._record(start, None, None, attempt + 1)
+                    raise AnalystError(f"Request to Cortex Analyst failed: {e}") from e
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            if resp.status_code == 401 and self._refresh_token and not refreshed:
+                refreshed = True
+                # Streamed responses hold their pooled connection until closed
+                resp.close()
+                self._refresh_token()
+                continue
+
+            if resp.status_code in RETRYABLE_STATUSES and attempt < self.max_retries:
+                delay = self._backoff(attempt, resp.headers.get("Retry-After"))
+                resp.close()
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            request_id = resp.headers.get("X-Snowflake-Request-Id")
+            # Spans opened while the answer streams in inherit the request id
+            TRACER.annotate(request_id=request_id, status_code=resp.status_code, attempts=attempt + 1)
+            if not stream or resp.status_code >= 400:
+                # Streamed calls are recorded once the stream has been consumed
+                self._record(start, resp.status_code, request_id, attempt + 1)
+            if resp.status_code >= 400:
+                raise AnalystError(
+                    f"Failed request (id: {request_id}) with status {resp.status_code}: {resp.text}",
+                    status_code=resp.status_code,
+                    request_id=request_id,
+                )
+            return resp, attempt + 1
+
+    def send_message(
+        self,
+        prompt: Optional[str] = None,
+        messages: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        """Sends a question (or a full messages list) and returns the response with its request id."""
+        request_body = {
+            "messages": messages or [user_message(prompt)],
+            "semantic_model_file": self.semantic_model_file,
+        }
+        resp, _ = self.post(request_body)
+        return {**resp.json(), "request_id": resp.headers.get("X-Snowflake-Request-Id")}
+
+    def stream_message(
+        self,
+        prompt: Optional[str] = None,
+        messages: Optional[List[Dict[str, Any]]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Sends a question in streaming mode and yields events as the answer arrives.
+
+        Yields dicts with a "type" of:
+            status: the Analyst's progress ("status" key).
+            text_delta: a chunk of text for the content item at "index".
+            item: a content item that is complete ("index", "item"); items
+                complete in order, as soon as the next one starts.
+            done: the assembled "message", "request_id" and "ttft_seconds".
+        """
+        request_body = {
+            "messages": messages or [user_message(prompt)],
+            "semantic_model_file": self.semantic_model_file,
+            "stream": True,
+        }
+        start = time.perf_counter()
+        resp, attempts = self.post(request_body, stream=True)
+        request_id = resp.headers.get("X-Snowflake-Request-Id")
+
+        content: List[Dict[str, Any]] = []
+        ttft: Optional[float] = None
+        try:
+            for event, data in _parse_sse(resp):
+                if event == "status":
+                    yield {"type": "status", "status": data.get("status_message") or data.get("status")}
+
+                elif event == "message.content.delta":
+                    index = data["index"]
+                    if index >= len(content):
+                        for completed in range(len(content)):
+                            if not content[completed].get("_yielded"):
+                                content[completed]["_yielded"] = True
+                                yield {"type": "item", "index": completed, "item": _public(content[completed])}
+                        content.append({"type": data["type"]})
+                    item = content[index]
+                    if data["type"] == "text":
+                        item["text"] = item.get("text", "") + data["text_delta"]
+                        if ttft is None:
+                            ttft = time.perf_counter() - start
+                        yield {"type": "text_delta", "index": index, "text": data["text_delta"]}
+                    elif data["type"] == "sql":
+                        item["statement"] = item.get("statement", "") + data["statement_delta"]
+                        if "confidence" in data:
+                            item["confidence"] = data["confidence"]
+                    elif data["type"] == "suggestions":
+                        delta = data["suggestions_delta"]
+                        suggestions = item.setdefault("suggestions", [])
+                        while len(suggestions) <= delta["index"]:
+                            suggestions.append("")
+                        suggestions[delta["index"]] += delta["suggestion_delta"]
+
+                elif event == "error":
+                    raise AnalystError(
+                        f"Failed request (id: {data.get('request_id', request_id)}): {data.get('message')}",
+                        request_id=data.get("request_id", request_id),
+                    )
+        finally:
+            resp.close()
+
+        for index, item in enumerate(content):
+            if not item.get("_yielded"):
+                yield {"type": "item", "index": index, "item": _public(item)}
+
+        self._record(start, resp.status_code, request_id, attempts, ttft_seconds=ttft)
+        yield {
+            "type": "done",
+            "message": {"role": "analyst", "content": [_public(item) for item in content]},
+            "request_id": request_id,
+            "ttft_seconds": ttft,
+        }
+
+    def _record(
+        self,
+        start: float,
+        status: Optional[int],
+        request_id: Optional[str],
+        attempts: int,
+        **extra: Any,
+    ) -> None:
+        with self._lock:
+            self.calls.append(
+                {
+                    "latency_seconds": time.perf_counter() - start,
+                    "status": status,
+                    "request_id": request_id,
+                    "attempts": attempts,
+                    "timestamp": time.time(),
+                    **extra,
+                }
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns latency percentiles and retry counts over the recent calls."""
+        with self._lock:
+            calls = list(self.calls)
+        latencies = sorted(call["latency_seconds"] for call in calls)
+
+        def percentile(q: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+        ttfts = sorted(call["ttft_seconds"] for call in calls if call.get("ttft_seconds") is not None)
+
+        return {
+            "calls": len(calls),
+            "errors": sum(1 for call in calls if call["status"] is None or call["status"] >= 400),
+            "retries": sum(call["attempts"] - 1 for call in calls),
+            "p50_seconds": percentile(0.50),
+            "p95_seconds": percentile(0.95),
+            "max_seconds": latencies[-1] if latencies else 0.0,
+            "p50_ttft_seconds": ttfts[len(ttfts) // 2] if ttfts else 0.0,
+        }
+
+
+def _parse_sse(resp: requests.Response) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Parses a server-sent events stream into (event, data) pairs."""
+    event, data_lines = "message", []
+    for raw_line in resp.iter_lines():
+        line = raw_line.decode("utf-8")
+        if not line:
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+    if data_lines:
+        yield event, json.loads("\n".join(data_lines))
+
+
+def _public(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in item.items() if not key.startswith("_")}
+
+
+# Shared by every session served from this process
+ANALYST_CLIENT = AnalystClient()
@@ -0,0 +1,69 @@
+import time
+from typing import Any, Callable, Dict, Iterator, List
+
+import streamlit as st
+
+from tracing import TRACER
+
+
+def render_stream(
+    events: Iterator[Dict[str, Any]],
+    render_item: Callable[[Dict[str, Any], Callable[[], None]], None],
+) -> Dict[str, Any]:
+    """Renders a streamed Analyst response as it arrives.
+
+    Text is drawn progressively; every other content item (SQL, suggestions)
+    is passed to render_item as soon as it is complete, so the SQL starts
+    running while the rest of the answer is still streaming. render_item
+    also gets a callback to call when the first result rows arrive. The
+    stream is traced as a send_message span; rendering the items is traced
+    outside it.
+
+    Returns:
+        Dict[str, Any]: The assembled response ("message", "request_id") plus
+        "timings" with ttft_seconds and ttfr_seconds (time to first result rows).
+    """
+    start = time.perf_counter()
+    status = st.empty()
+    status.caption("The assistant is working on your question...")
+
+    placeholders: List[Any] = []
+    texts: List[str] = []
+    ttfr: List[float] = []
+    response: Dict[str, Any] = {}
+
+    def on_rows() -> None:
+        if not ttfr:
+            ttfr.append(time.perf_counter() - start)
+
+    with TRACER.span("send_message") as span:
+        for event in events:
+            if event["type"] == "status":
+                status.caption(event["status"])
+
+            elif event["type"] == "text_delta":
+                while len(placeholders) <= event["index"]:
+                    placeholders.append(st.empty())
+                    texts.append("")
+                texts[event["index"]] += event["text"]
+                placeholders[event["index"]].markdown(texts[event["index"]])
+
+            elif event["type"] == "item":
+                if event["item"]["type"] == "text":
+                    continue
+                while len(placeholders) <= event["index"]:
+                    placeholders.append(st.empty())
+                    texts.append("")
+                with TRACER.outside(span), placeholders[event["index"]].container():
+                    render_item(event["item"], on_rows)
+
+            elif event["type"] == "done":
+                response = event
+                span.set(ttft_seconds=event.get("ttft_seconds"))
+
+    status.empty()
+    return {
+        "message": response.get("message", {"content": []}),
+        "request_id": response.get("request_id"),
+        "timings": {"ttft_seconds": response.get("ttft_seconds"), "ttfr_seconds": ttfr[0] if ttfr else None},
+    }
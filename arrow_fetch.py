@@ -0,0 +1,185 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+try:
+    from tracing import TRACER
+except ImportError:
+    # Streamlit in Snowflake stages this module alone, without tracing.py and conn_config.py
+    class _UntracedSpan:
+        def set(self, **attributes: Any) -> None:
+            pass
+
+    class _Untraced:
+        @contextmanager
+        def span(self, name: str, **attributes: Any) -> Iterator[_UntracedSpan]:
+            yield _UntracedSpan()
+
+    TRACER = _Untraced()  # type: ignore[assignment]
+
+
+def iter_arrow_batches(cur: Any) -> Iterator[pa.Table]:
+    """Yields the result of an executed cursor as Arrow tables, one per result chunk."""
+    for batch in cur.fetch_arrow_batches():
+        if batch.num_rows:
+            yield batch
+
+
+def empty_table(cur: Any) -> pa.Table:
+    """Builds an empty table with the cursor's column names, for queries without rows."""
+    return pa.table({column[0]: pa.array([], type=pa.null()) for column in cur.description or []})
+
+
+def fetch_arrow(conn: Any, statement: str) -> Tuple[pa.Table, Dict[str, Any]]:
+    """Runs a statement and fetches its result as Arrow record batches.
+
+    Rows stay in Arrow's columnar format end to end, skipping the per-row
+    Python tuples of the DBAPI fetch path.
+
+    Returns:
+        Tuple[pa.Table, Dict[str, Any]]: The result and its fetch statistics
+        (query_id, rows, bytes, batches, seconds, rows_per_second).
+    """
+    start = time.perf_counter()
+    cur = conn.cursor()
+    try:
+        with TRACER.span("run_sql") as span:
+            cur.execute(statement)
+            executed = time.perf_counter()
+            batches: List[pa.Table] = list(iter_arrow_batches(cur))
+            table = pa.concat_tables(batches) if batches else empty_table(cur)
+            query_id: Optional[str] = cur.sfqid
+            span.set(query_id=query_id, rows=table.num_rows)
+    finally:
+        cur.close()
+
+    end = time.perf_counter()
+    stats = {
+        "query_id": query_id,
+        "rows": table.num_rows,
+        "bytes": table.nbytes,
+        "batches": len(batches),
+        "execute_seconds": executed - start,
+        "fetch_seconds": end - executed,
+        "seconds": end - start,
+        "rows_per_second": table.num_rows / (end - executed) if end > executed else 0.0,
+    }
+    return table, stats
+
+
+def arrow_to_pandas(table: pa.Table) -> pd.DataFrame:
+    """Converts an Arrow table to pandas without consolidating columns into 2D blocks.
+
+    Keeping one block per column lets numeric columns without nulls share
+    Arrow's buffers instead of being copied.
+    """
+    return table.to_pandas(split_blocks=True)
+
+
+def format_fetch_stats(stats: Dict[str, Any]) -> str:
+    """Formats fetch statistics for display under a result."""
+    return (
+        f"{stats['rows']:,} rows · {stats['bytes'] / 1e6:.2f} MB · "
+        f"{stats['rows_per_second']:,.0f} rows/s · {stats['seconds']:.2f} s"
+    )
+
+
+class BatchedResult:
+    """Result of a statement downloaded chunk by chunk on a background thread.
+
+    The statement runs on a connection borrowed from the pool only long enough
+    to execute it; the result chunks are then downloaded independently of the
+    connection until row_cap rows are loaded. load_more() raises the cap and
+    resumes downloading.
+    """
+
+    def __init__(self, pool: Any, statement: str, row_cap: int) -> None:
+        self.statement = statement
+        self.row_cap = row_cap
+        self.started = time.perf_counter()
+        self.first_batch_seconds: Optional[float] = None
+        self.download_seconds = 0.0
+        self.error: Optional[BaseException] = None
+
+        with pool.connection() as conn, TRACER.span("run_sql") as span:
+            cur = conn.cursor()
+            try:
+                cur.execute(statement)
+                self.query_id: Optional[str] = cur.sfqid
+                self.total_rows: Optional[int] = cur.rowcount
+                self._pending = list(cur.get_result_batches() or [])
+                self._empty = empty_table(cur)
+            finally:
+                cur.close()
+            span.set(query_id=self.query_id, rows=self.total_rows)
+
+        self._tables: List[pa.Table] = []
+        self.rows = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._start()
+
+    def _start(self) -> None:
+        self._thread = threading.Thread(target=self._download, name="result-batches", daemon=True)
+        self._thread.start()
+
+    def _download(self) -> None:
+        start = time.perf_counter()
+        try:
+            while self._pending and self.rows < self.row_cap:
+                table = self._pending[0].to_arrow()
+                with self._lock:
+                    self._pending.pop(0)
+                    if table.num_rows:
+                        self._tables.append(table)
+                        self.rows += table.num_rows
+                        self.bytes += table.nbytes
+                        if self.first_batch_seconds is None:
+                            self.first_batch_seconds = time.perf_counter() - self.started
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.download_seconds += time.perf_counter() - start
+
+    @property
+    def fetching(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def complete(self) -> bool:
+        return not self._pending
+
+    @property
+    def capped(self) -> bool:
+        return not self.fetching and not self.complete and self.error is None
+
+    def load_more(self, rows: int) -> None:
+        """Raises the row cap and resumes downloading."""
+        self.row_cap += rows
+        if not self.fetching:
+            self._start()
+
+    def table(self) -> pa.Table:
+        """Returns the rows loaded so far."""
+        with self._lock:
+            tables = list(self._tables)
+        if not tables:
+            return self._empty
+        return pa.concat_tables(tables)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns fetch statistics in the same shape as fetch_arrow()."""
+        return {
+            "query_id": self.query_id,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "batches": len(self._tables),
+            "seconds": time.perf_counter() - self.started,
+            "first_batch_seconds": self.first_batch_seconds,
+            "rows_per_second": self.rows / self.download_seconds if self.download_seconds else 0.0,
+        }
@@ -0,0 +1,100 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataset_digest import insight_prompt
+
+
+QUESTION = "How has revenue developed over time and what stands out?"
+
+
+def legacy_prompt(question: str, df: pd.DataFrame) -> str:
+    """The prompt generate_insights built before the digest: every row as JSON."""
+    return (
+        f"The user has asked the following question: '{question}'. "
+        "Below is the dataset retrieved to address the question. "
+        "Analyze the dataset, extract meaningful insights, and present a concise response:\n\n"
+        f"Dataset:\n{df.to_json(orient='split')}"
+    )
+
+
+def synthetic_result(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Builds a daily revenue result per product line, like the Analyst returns."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(rows)
+    return pd.DataFrame(
+        {
+            "DATE": pd.Timestamp("2020-01-01") + pd.to_timedelta(t // 4, unit="D"),
+            "PRODUCT_LINE": rng.choice(["Electronics", "Clothing", "Home Appliances", "Toys"], rows),
+            "REVENUE": 1000 + 0.2 * t + rng.normal(0, 150, rows),
+            "COGS": 600 + 0.1 * t + rng.normal(0, 90, rows),
+        }
+    )
+
+
+def token_counter():
+    """Returns a token counting function, exact with tiktoken and approximate without."""
+    try:
+        import tiktoken
+    except ImportError:
+        return (lambda text: len(text) // 4), "chars/4"
+    encoding = tiktoken.get_encoding("cl100k_base")
+    return (lambda text: len(encoding.encode(text))), "cl100k_base"
+
+
+def timed(func, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def llm_seconds(prompt: str, model: str) -> float:
+    """Sends one prompt to OpenAI and returns the end-to-end latency."""
+    from chat_client import ChatClient
+
+    # Uncached, so repeated runs measure the model
+    client = ChatClient(cache=None)
+    client.stream(prompt, model=model)
+    return client.calls[-1]["latency_seconds"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare insight prompt size and latency: raw JSON vs digest.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000])
+    parser.add_argument("--csv", help="Benchmark a real result instead, e.g. data/daily_revenue.csv")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--live", action="store_true", help="Also time the LLM call (needs OpenAI_api_key)")
+    parser.add_argument("--model", default="gpt-3.5-turbo")
+    args = parser.parse_args()
+
+    if args.csv:
+        frames = [(args.csv, pd.read_csv(args.csv))]
+    else:
+        frames = [(f"{rows:,} rows", synthetic_result(rows)) for rows in args.rows]
+
+    count_tokens, tokenizer = token_counter()
+    print(f"tokens counted with {tokenizer}")
+    print(f"{'result':>16} {'json tokens':>12} {'digest tokens':>14} {'json build':>11} {'digest build':>13}"
+          + (f" {'json llm':>9} {'digest llm':>11}" if args.live else ""))
+    for label, df in frames:
+        before, build_before = timed(lambda: legacy_prompt(QUESTION, df), args.repeat)
+        after, build_after = timed(lambda: insight_prompt(QUESTION, df), args.repeat)
+        line = (f"{label:>16} {count_tokens(before):>12,} {count_tokens(after):>14,} "
+                f"{build_before * 1e3:>8.1f} ms {build_after * 1e3:>10.1f} ms")
+        if args.live:
+            # Prompts beyond the model's context window fail, which is part of the comparison
+            try:
+                line += f" {llm_seconds(before, args.model):>7.2f} s"
+            except Exception as e:
+                line += f" {type(e).__name__:>9}"
+            line += f" {llm_seconds(after, args.model):>9.2f} s"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from downsample import downsample_frame
+
+
+def synthetic_series(days: int, columns: int, seed: int = 0) -> pd.DataFrame:
+    """Builds a daily revenue-like frame with a trend, seasonality and noise per column."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2015-01-01", periods=days, freq="D", name="DATE")
+    t = np.arange(days)
+    data = {
+        f"MEASURE_{column}": 1000 + 0.5 * t + 200 * np.sin(2 * np.pi * t / 365) + rng.normal(0, 80, days)
+        for column in range(columns)
+    }
+    return pd.DataFrame(data, index=index)
+
+
+def payload(df: pd.DataFrame) -> bytes:
+    """Serializes a chart frame to Arrow IPC, the format Streamlit ships to the browser."""
+    table = pa.Table.from_pandas(df.reset_index())
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def timed(func, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LTTB downsampling of chart frames.")
+    parser.add_argument("--days", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--columns", type=int, default=3)
+    parser.add_argument("--points", type=int, default=1_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'payload before':>15} {'payload after':>14} {'points after':>13} "
+          f"{'encode before':>14} {'lttb + encode':>14}")
+    for days in args.days:
+        df = synthetic_series(days, args.columns)
+        before, encode_before = timed(lambda: payload(df), args.repeat)
+        (after, reduced), encode_after = timed(
+            lambda: (lambda small: (payload(small), small))(downsample_frame(df, args.points)), args.repeat
+        )
+        print(f"{days:>9,} {len(before) / 1e3:>12.1f} kB {len(after) / 1e3:>11.1f} kB {len(reduced):>13,} "
+              f"{encode_before * 1e3:>11.2f} ms {encode_after * 1e3:>11.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
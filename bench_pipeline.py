@@ -0,0 +1,301 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from conn_config import config_dict as cfg
+from semantic_model import verified_queries
+
+
+STAGES = ["analyst", "sql", "dataframe", "chart", "insight"]
+# Histogram bucket upper bounds in milliseconds
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1_000, 2_000, 5_000, 10_000, 30_000]
+
+
+def load_corpus(questions_file: Optional[str] = None, include_verified: bool = True) -> List[Dict[str, str]]:
+    """Builds the question corpus from the verified queries and a JSONL questions file.
+
+    The file uses the request_id/title/body format of requests.jsonl; the
+    body is the question, falling back to the title when empty.
+    """
+    corpus = []
+    if include_verified:
+        for query in verified_queries():
+            if query.get("question"):
+                corpus.append({"id": query.get("name", query["question"]), "question": query["question"]})
+    if questions_file:
+        with open(questions_file, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    corpus.append({"id": entry["request_id"], "question": entry.get("body") or entry["title"]})
+    return corpus
+
+
+def use_offline_backends(port: int) -> None:
+    """Points the pipeline at the mock Analyst and the local DuckDB engine.
+
+    Must run before the pipeline modules are imported, as they read the
+    configuration when loaded.
+    """
+    cfg["local_engine"] = True
+    cfg["analyst_base_url"] = f"http://127.0.0.1:{port}"
+    from mock_analyst_server import serve
+
+    serve(port)
+
+
+class Pipeline:
+    """The stages process_message runs for a question, without Streamlit.
+
+    Each stage is timed separately: the Analyst answer (or a verified query
+    or semantic cache hit when shortcuts are on), running the SQL, building
+    the DataFrame, preparing the chart frames and generating the insight.
+    Queries go through the replica router, as in the apps.
+    """
+
+    def __init__(self, shortcuts: bool = True, insight_llm: bool = False) -> None:
+        # Imported here so use_offline_backends() can configure them first
+        from analyst_client import ANALYST_CLIENT, user_message
+        from arrow_fetch import arrow_to_pandas, fetch_arrow
+        from chart_planner import chart_frame
+        from local_replica import ROUTER
+        from dataset_digest import insight_prompt
+        from downsample import downsample_frame
+        from semantic_cache import SEMANTIC_CACHE, cached_response
+        from verified_queries import VERIFIED_QUERIES, verified_response
+
+        self.shortcuts = shortcuts
+        self.insight_llm = insight_llm
+        self._analyst = ANALYST_CLIENT
+        self._user_message = user_message
+        self._arrow_to_pandas = arrow_to_pandas
+        self._fetch_arrow = fetch_arrow
+        self._chart_frame = chart_frame
+        self._pool = ROUTER
+        if ROUTER.enabled:
+            # Loaded up front, so queries are not routed to Snowflake while it loads
+            ROUTER.replica.refresh()
+        self._insight_prompt = insight_prompt
+        self._downsample = downsample_frame
+        self._semantic_cache = SEMANTIC_CACHE
+        self._cached_response = cached_response
+        self._verified = VERIFIED_QUERIES
+        self._verified_response = verified_response
+
+    def answer(self, question: str) -> Dict[str, Any]:
+        if self.shortcuts:
+            match = self._verified.match(question)
+            if match is not None:
+                return {**self._verified_response(match), "source": "verified"}
+            hit = self._semantic_cache.lookup(question)
+            if hit is not None:
+                return {**self._cached_response(hit), "source": "semantic_cache"}
+        response: Dict[str, Any] = {}
+        for event in self._analyst.stream_message(messages=[self._user_message(question)]):
+            if event["type"] == "done":
+                response = event
+        if self.shortcuts:
+            self._semantic_cache.add(question, response["message"]["content"], response["request_id"])
+        return {**response, "source": "analyst"}
+
+    def run(self, question: str) -> Dict[str, Any]:
+        """Runs one question through every stage and returns the per-stage seconds."""
+        record: Dict[str, Any] = {"question": question, "stages": {}, "status": "ok", "error": None}
+        stages = record["stages"]
+
+        def timed(stage: str, func: Callable[[], Any]) -> Any:
+            start = time.perf_counter()
+            try:
+                return func()
+            finally:
+                stages[stage] = stages.get(stage, 0.0) + time.perf_counter() - start
+
+        try:
+            response = timed("analyst", lambda: self.answer(question))
+            record["source"] = response["source"]
+            record["ttft_seconds"] = response.get("ttft_seconds")
+            for item in response["message"]["content"]:
+                if item["type"] != "sql":
+                    continue
+                statement = item["statement"]
+
+                def fetch() -> Any:
+                    with self._pool.connection() as conn:
+                        return self._fetch_arrow(conn, statement)
+
+                table, fetch_stats = timed("sql", fetch)
+                record["rows"] = record.get("rows", 0) + fetch_stats["rows"]
+                decision = self._pool.decision(fetch_stats["query_id"])
+                if decision is not None:
+                    record.setdefault("routes", []).append(decision["target"])
+                df = timed("dataframe", lambda: self._arrow_to_pandas(table))
+                if len(df.index) <= 1:
+                    continue
+                timed("chart", lambda: self._downsample(self._chart_frame(self._pool, statement, df)[0]))
+                insight_df = df.set_index(df.columns[0]) if len(df.columns) > 1 else df
+                timed("insight", lambda: self._insight(question, insight_df))
+        except Exception as e:
+            record.update(status="error", error=f"{type(e).__name__}: {e}")
+        record["seconds"] = sum(stages.values())
+        return record
+
+    def _insight(self, question: str, df: Any) -> str:
+        prompt = self._insight_prompt(question, df)
+        if not self.insight_llm:
+            return prompt
+        from chat_client import CHAT_CLIENT
+
+        return CHAT_CLIENT.stream(prompt, model=cfg["insight_model"])
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def histogram(values: List[float]) -> Dict[str, int]:
+    """Counts durations per bucket, keyed by the bucket's upper bound in ms."""
+    counts = {f"<={bound}ms": 0 for bound in BUCKETS_MS}
+    counts[f">{BUCKETS_MS[-1]}ms"] = 0
+    for value in values:
+        ms = value * 1000
+        key = next((f"<={bound}ms" for bound in BUCKETS_MS if ms <= bound), f">{BUCKETS_MS[-1]}ms")
+        counts[key] += 1
+    return counts
+
+
+def summarize(records: List[Dict[str, Any]], wall: float) -> Dict[str, Any]:
+    """Aggregates the per-question records into throughput and per-stage latency statistics."""
+    stages = {}
+    for stage in STAGES + ["total"]:
+        if stage == "total":
+            values = [record["seconds"] for record in records if record["status"] == "ok"]
+        else:
+            values = [record["stages"][stage] for record in records if stage in record["stages"]]
+        stages[stage] = {
+            "count": len(values),
+            "p50_seconds": percentile(values, 0.50),
+            "p95_seconds": percentile(values, 0.95),
+            "p99_seconds": percentile(values, 0.99),
+            "max_seconds": max(values) if values else 0.0,
+            "histogram": histogram(values),
+        }
+    routes: Dict[str, int] = {}
+    for record in records:
+        for route in record.get("routes", []):
+            routes[route] = routes.get(route, 0) + 1
+    sources: Dict[str, int] = {}
+    for record in records:
+        if "source" in record:
+            sources[record["source"]] = sources.get(record["source"], 0) + 1
+    return {
+        "questions": len(records),
+        "errors": sum(1 for record in records if record["status"] == "error"),
+        "wall_seconds": wall,
+        "throughput_per_second": len(records) / wall if wall else 0.0,
+        "sources": sources,
+        "routes": routes,
+        "stages": stages,
+    }
+
+
+def run_benchmark(
+    pipeline: Pipeline, corpus: List[Dict[str, str]], concurrency: int, repeat: int
+) -> Dict[str, Any]:
+    """Replays the corpus repeat times with concurrency questions in flight."""
+    questions = [entry for _ in range(repeat) for entry in corpus]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as executor:
+        records = list(executor.map(lambda entry: {"id": entry["id"], **pipeline.run(entry["question"])}, questions))
+    wall = time.perf_counter() - start
+    return {"records": records, "summary": summarize(records, wall)}
+
+
+def format_summary(summary: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    lines = [
+        f"{summary['questions']} questions, {summary['errors']} errors, {summary['wall_seconds']:.2f} s wall, "
+        f"{summary['throughput_per_second']:.2f} questions/s",
+        "answered by " + ", ".join(f"{source} {count}" for source, count in sorted(summary["sources"].items())),
+        "queries ran on " + ", ".join(f"{route} {count}" for route, count in sorted(summary["routes"].items())),
+        f"{'stage':<10} {'n':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}" + (f" {'p95 vs base':>12}" if baseline else ""),
+    ]
+    for stage, stats in summary["stages"].items():
+        line = (f"{stage:<10} {stats['count']:>5} {stats['p50_seconds'] * 1e3:>6.1f} ms "
+                f"{stats['p95_seconds'] * 1e3:>6.1f} ms {stats['p99_seconds'] * 1e3:>6.1f} ms "
+                f"{stats['max_seconds'] * 1e3:>6.1f} ms")
+        before = baseline["stages"].get(stage) if baseline else None
+        if before and before["p95_seconds"]:
+            line += f" {stats['p95_seconds'] / before['p95_seconds'] - 1:>+11.0%}"
+        lines.append(line)
+    lines.append("")
+    for stage, stats in summary["stages"].items():
+        if not stats["count"]:
+            continue
+        lines.append(f"{stage} latency histogram")
+        for bucket, count in stats["histogram"].items():
+            if count:
+                lines.append(f"  {bucket:>9} {'#' * max(1, round(40 * count / stats['count']))} {count}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay questions through the question-to-chart pipeline.")
+    parser.add_argument("--questions", help="JSONL questions file (request_id, title, body per line)")
+    parser.add_argument("--no-verified", action="store_true", help="Leave the verified questions out of the corpus")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=1, help="Times the corpus is replayed")
+    parser.add_argument("--offline", action="store_true", help="Use the mock Analyst and the local DuckDB engine")
+    parser.add_argument("--mock-port", type=int, default=cfg["mock_analyst_port"])
+    parser.add_argument("--replica", action="store_true", help="Run the queries it can on the local replica")
+    parser.add_argument("--no-shortcuts", action="store_true",
+                        help="Always ask the Analyst, skipping verified queries and the semantic cache")
+    parser.add_argument("--insight-llm", action="store_true", help="Generate insights with the LLM (needs OpenAI_api_key)")
+    parser.add_argument("--output", help="Results JSON file (default bench_results/pipeline_<time>.json)")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare p95 latencies against")
+    args = parser.parse_args()
+
+    if args.offline:
+        use_offline_backends(args.mock_port)
+    if args.replica:
+        cfg["replica_enabled"] = True
+    corpus = load_corpus(args.questions, include_verified=not args.no_verified)
+    if not corpus:
+        parser.error("the corpus is empty")
+    pipeline = Pipeline(shortcuts=not args.no_shortcuts, insight_llm=args.insight_llm)
+    started_at = datetime.now()
+    result = run_benchmark(pipeline, corpus, args.concurrency, args.repeat)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["summary"]
+    print(format_summary(result["summary"], baseline))
+
+    output = args.output or os.path.join("bench_results", f"pipeline_{started_at:%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    run = {
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "settings": {
+            "concurrency": args.concurrency,
+            "repeat": args.repeat,
+            "offline": args.offline,
+            "replica": args.replica,
+            "shortcuts": not args.no_shortcuts,
+            "insight_llm": args.insight_llm,
+            "questions_file": args.questions,
+        },
+        **result,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2, default=str)
+    print(f"\nSaved {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,9 @@ import streamlit as st
 import time
 from snowflake.snowpark.context import get_active_session
 
+# arrow_fetch.py must be uploaded to the stage alongside this file
+from arrow_fetch import arrow_to_pandas, fetch_arrow, format_fetch_stats
+
 DATABASE = "cortex_analyst_demo"
 SCHEMA = "revenue_timeseries"
 STAGE = "raw_data"
@@ -93,7 +96,9 @@ def display_sql(sql: str) -> None:
     with st.expander("Results", expanded=True):
         with st.spinner("Running SQL..."):
             session = get_active_session()
-            df = session.sql(sql).to_pandas()
+            table, stats = fetch_arrow(session.connection, sql)
+            st.caption(format_fetch_stats(stats))
+            df = arrow_to_pandas(table)
             if len(df.index) > 1:
                 data_tab, line_tab, bar_tab = st.tabs(
                     ["Data", "Line Chart", "Bar Chart"]
@@ -0,0 +1,112 @@
+from typing import Any, List, Optional, Tuple
+
+import pandas as pd
+
+from conn_config import config_dict as cfg
+from result_store import get_result
+from downsample import downsample_frame
+from semantic_model import additive_columns, time_dimensions
+
+
+ROW_THRESHOLD = cfg["chart_row_threshold"]
+TARGET_POINTS = cfg["chart_target_points"]
+
+# Bucket sizes in days, finest first
+GRAINS = [("day", 1), ("week", 7), ("month", 30), ("quarter", 91), ("year", 365)]
+
+def quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def time_column(df: pd.DataFrame) -> Optional[str]:
+    """Returns the result column holding the semantic model's time dimension, if any."""
+    names = {name.lower() for name in time_dimensions()}
+    for column in df.columns:
+        if str(column).lower() in names:
+            return column
+    return None
+
+
+def choose_grain(start: pd.Timestamp, end: pd.Timestamp, target_points: int = TARGET_POINTS) -> str:
+    """Returns the finest bucket size that keeps the time axis within target_points."""
+    span_days = max((end - start).days, 1)
+    for grain, days in GRAINS:
+        if span_days / days <= target_points:
+            return grain
+    return GRAINS[-1][0]
+
+
+def plan_chart_query(statement: str, df: pd.DataFrame) -> Optional[Tuple[str, str]]:
+    """Plans a bucketed aggregate of a result for charting.
+
+    Returns None when the result is small enough to chart as is, has no
+    time dimension column or has a numeric column that is not an additive
+    measure of the semantic model (an id, a running total, an average...),
+    which per-bucket sums would misrepresent. Otherwise returns the
+    rewritten SQL, which wraps the Analyst statement and sums each numeric
+    column per time bucket (and per category column), and the chosen grain.
+    """
+    if len(df.index) <= ROW_THRESHOLD:
+        return None
+
+    date_column = time_column(df)
+    if date_column is None:
+        return None
+
+    dates = pd.to_datetime(df[date_column], errors="coerce").dropna()
+    if dates.empty:
+        return None
+    grain = choose_grain(dates.min(), dates.max())
+
+    categories: List[str] = []
+    measures: List[str] = []
+    for column in df.columns:
+        if column == date_column:
+            continue
+        if pd.api.types.is_numeric_dtype(df[column]):
+            measures.append(column)
+        else:
+            categories.append(column)
+
+    additive = {name.lower() for name in additive_columns()}
+    if any(str(column).lower() not in additive for column in measures):
+        return None
+
+    # Only re-query when bucketing actually reduces the number of points
+    if grain == "day" and not df.duplicated([date_column, *categories]).any():
+        return None
+
+    select = [f"DATE_TRUNC('{grain}', {quote(date_column)}) AS {quote(date_column)}"]
+    select += [quote(column) for column in categories]
+    select += [f"SUM({quote(column)}) AS {quote(column)}" for column in measures]
+    group_by = ", ".join(str(position) for position in range(1, len(categories) + 2))
+
+    sql = (
+        f"SELECT {', '.join(select)}\n"
+        f"FROM (\n{statement.strip().rstrip(';')}\n) AS analyst_result\n"
+        f"GROUP BY {group_by}\n"
+        f"ORDER BY 1"
+    )
+    return sql, grain
+
+
+def chart_frame(pool: Any, statement: str, df: pd.DataFrame) -> Tuple[pd.DataFrame, Optional[str]]:
+    """Returns the frame to chart for a result, indexed by its first column.
+
+    Large time series are replaced by their server-side bucketed aggregate;
+    large results that cannot be re-aggregated are downsampled with LTTB.
+    The second element is the grain used, or None when the result is not
+    aggregated.
+    """
+    plan = plan_chart_query(statement, df)
+    if plan is None:
+        chart_df, grain = df, None
+    else:
+        sql, grain = plan
+        chart_df = get_result(pool, sql).to_pandas()
+
+    if len(chart_df.columns) > 1:
+        chart_df = chart_df.set_index(chart_df.columns[0])
+    if plan is None and len(chart_df.index) > ROW_THRESHOLD:
+        chart_df = downsample_frame(chart_df)
+    return chart_df, grain
@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+from openai import OpenAI
+
+from llm_cache import LLM_CACHE, LLMCache
+
+
+SYSTEM_PROMPT = "You are a helpful assistant for supply chain analysis."
+
+
+class ChatClient:
+    """Streams OpenAI chat completions and records their latency.
+
+    Every call records the time to the first token and the total latency so
+    stats() can report percentiles over the recent calls. Responses are
+    served from the LLM cache when the same prompt was answered before;
+    those calls are recorded with "cached" set and left out of the latency
+    percentiles.
+    """
+
+    def __init__(
+        self, api_key: Optional[str] = None, cache: Optional[LLMCache] = LLM_CACHE, history_size: int = 500
+    ) -> None:
+        self._api_key = api_key
+        self.cache = cache
+        self._client: Optional[OpenAI] = None
+        self._lock = threading.Lock()
+        self.calls: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+
+    @property
+    def client(self) -> OpenAI:
+        # Created on first use so the key can come from a .env file loaded after import
+        if self._client is None:
+            self._client = OpenAI(api_key=self._api_key or os.environ["OpenAI_api_key"])
+        return self._client
+
+    def stream(
+        self,
+        user_prompt: str,
+        model: str = "gpt-3.5-turbo",
+        on_token: Optional[Callable[[str], None]] = None,
+        system_prompt: str = SYSTEM_PROMPT,
+    ) -> str:
+        """Sends a prompt and returns the full response, passing each token to on_token as it arrives."""
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+        start = time.perf_counter()
+        if self.cache is not None:
+            cached = self.cache.get(model, messages)
+            if cached is not None:
+                if on_token is not None:
+                    on_token(cached)
+                self._record(start, model, None, error=False, cached=True)
+                return cached
+
+        ttft = None
+        parts = []
+        try:
+            stream = self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if not token:
+                    continue
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                parts.append(token)
+                if on_token is not None:
+                    on_token(token)
+        except Exception:
+            self._record(start, model, ttft, error=True)
+            raise
+        self._record(start, model, ttft, error=False)
+        response = "".join(parts).strip()
+        if self.cache is not None:
+            self.cache.put(model, messages, response)
+        return response
+
+    def _record(self, start: float, model: str, ttft: Optional[float], error: bool, cached: bool = False) -> None:
+        with self._lock:
+            self.calls.append(
+                {
+                    "latency_seconds": time.perf_counter() - start,
+                    "ttft_seconds": ttft,
+                    "model": model,
+                    "error": error,
+                    "cached": cached,
+                    "timestamp": time.time(),
+                }
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns time-to-first-token and total latency percentiles over the recent model calls."""
+        with self._lock:
+            recent = list(self.calls)
+        calls = [call for call in recent if not call["cached"]]
+        latencies = sorted(call["latency_seconds"] for call in calls)
+        ttfts = sorted(call["ttft_seconds"] for call in calls if call["ttft_seconds"] is not None)
+
+        def percentile(values: list, q: float) -> float:
+            if not values:
+                return 0.0
+            return values[min(len(values) - 1, int(q * len(values)))]
+
+        return {
+            "calls": len(calls),
+            "cache_hits": len(recent) - len(calls),
+            "errors": sum(1 for call in calls if call["error"]),
+            "p50_ttft_seconds": percentile(ttfts, 0.50),
+            "p95_ttft_seconds": percentile(ttfts, 0.95),
+            "p50_seconds": percentile(latencies, 0.50),
+            "p95_seconds": percentile(latencies, 0.95),
+        }
+
+
+# Shared by every session served from this process
+CHAT_CLIENT = ChatClient()
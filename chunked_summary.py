@@ -0,0 +1,93 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from conn_config import config_dict as cfg
+
+
+CHUNK_TOKENS = cfg["summary_chunk_tokens"]
+MAX_WORKERS = cfg["summary_max_workers"]
+
+_PARAGRAPHS = re.compile(r"\n\s*\n")
+_SENTENCES = re.compile(r"(?<=[.!?])\s+")
+
+
+def count_tokens(text: str) -> int:
+    """Estimates the token count of a text (about four characters per token for English)."""
+    return (len(text) + 3) // 4
+
+
+def _split_words(text: str, max_tokens: int) -> List[str]:
+    pieces, current = [], []
+    for word in text.split():
+        if current and count_tokens(" ".join(current + [word])) > max_tokens:
+            pieces.append(" ".join(current))
+            current = []
+        current.append(word)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def split_text(text: str, max_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """Splits a text into chunks of at most max_tokens, on paragraph and sentence boundaries.
+
+    Paragraphs are packed together while they fit. A paragraph that is too
+    long on its own is split into sentences, and a sentence that is still too
+    long is split on words.
+    """
+    units: List[str] = []
+    for paragraph in _PARAGRAPHS.split(text.strip()):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        if count_tokens(paragraph) <= max_tokens:
+            units.append(paragraph)
+            continue
+        for sentence in _SENTENCES.split(paragraph):
+            if count_tokens(sentence) <= max_tokens:
+                units.append(sentence)
+            else:
+                units.extend(_split_words(sentence, max_tokens))
+
+    chunks: List[str] = []
+    for unit in units:
+        if chunks and count_tokens(chunks[-1] + "\n\n" + unit) <= max_tokens:
+            chunks[-1] += "\n\n" + unit
+        else:
+            chunks.append(unit)
+    return chunks
+
+
+def map_reduce_summarize(
+    text: str,
+    summarize: Callable[[str], str],
+    max_tokens: int = CHUNK_TOKENS,
+    max_workers: int = MAX_WORKERS,
+) -> str:
+    """Summarizes a text of any length with a summarize function that has a limited context.
+
+    Texts that fit in max_tokens are summarized in one call. Longer texts are
+    split into chunks that are summarized in parallel (map); the partial
+    summaries are then joined and summarized again, repeating until they fit
+    in one call (reduce).
+
+    Args:
+        text (str): The text to summarize.
+        summarize (Callable[[str], str]): Summarizes one chunk, e.g. Cortex Summarize.
+        max_tokens (int): Token budget per call.
+        max_workers (int): Maximum number of chunks summarized at the same time.
+
+    Returns:
+        str: The summary.
+    """
+    chunks = split_text(text, max_tokens)
+    while len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summarize") as executor:
+            partials = [summary.strip() for summary in executor.map(summarize, chunks)]
+        joined = "\n\n".join(partials)
+        if count_tokens(joined) >= count_tokens("\n\n".join(chunks)):
+            # The summaries did not get shorter, stop instead of looping forever
+            return joined
+        chunks = split_text(joined, max_tokens)
+    return summarize(chunks[0]).strip() if chunks else ""
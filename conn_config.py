@@ -12,5 +12,65 @@ config_dict = {
     "schema" : "REVENUE_TIMESERIES",
     "stage" : "RAW_DATA",    
     "file" : "revenue_timeseries.yaml",       
-    "role" : "CORTEX_USER_ROLE"    
+    "role" : "CORTEX_USER_ROLE",
+    "result_cache_max_bytes" : 256 * 1024 * 1024,
+    "data_load_schedule" : "02:00",
+    "result_spill_bytes" : 8 * 1024 * 1024,
+    "result_spill_dir" : None,
+    "pool_max_size" : 8,
+    "pool_max_idle_seconds" : 600,
+    "pool_keepalive_seconds" : 60,
+    "pool_acquire_timeout" : 30,
+    "analyst_connect_timeout" : 5,
+    "analyst_read_timeout" : 60,
+    "analyst_max_retries" : 3,
+    "analyst_backoff_base" : 0.5,
+    "analyst_backoff_max" : 8,
+    "result_row_cap" : 100000,
+    "result_load_more_rows" : 100000,
+    "result_poll_seconds" : 0.2,
+    "result_preview_refresh_seconds" : 2,
+    "chart_row_threshold" : 2000,
+    "chart_target_points" : 400,
+    "lttb_points" : 1000,
+    "digest_max_chars" : 6000,
+    "insight_model" : "gpt-3.5-turbo",
+    "insight_cache_path" : None,
+    "insight_cache_max_bytes" : 16 * 1024 * 1024,
+    "insight_workers" : 4,
+    "insight_autostart" : False,
+    "insight_poll_seconds" : 0.5,
+    "llm_max_workers" : 5,
+    "llm_timeout_seconds" : 60,
+    "summary_chunk_tokens" : 2000,
+    "summary_max_workers" : 4,
+    "llm_cache_path" : None,
+    "llm_cache_max_bytes" : 64 * 1024 * 1024,
+    "llm_cache_ttl_seconds" : 24 * 60 * 60,
+    "llm_cache_bypass" : False,
+    "llm_cache_refresh" : False,
+    "analyst_history_tokens" : 2000,
+    "analyst_history_full_exchanges" : 2,
+    "verified_query_threshold" : 0.9,
+    "semantic_cache_threshold" : 0.9,
+    "semantic_cache_max_entries" : 5000,
+    "semantic_cache_model" : None,
+    "analyst_base_url" : None,
+    "local_engine" : False,
+    "local_data_dir" : "data",
+    "local_batch_rows" : 10000,
+    "mock_analyst_port" : 8765,
+    "mock_analyst_fixtures" : "analyst_fixtures.json",
+    "mock_analyst_latency_seconds" : 0.0,
+    "mock_analyst_chunk_seconds" : 0.0,
+    "trace_path" : None,
+    "trace_export" : True,
+    "trace_history_size" : 2000,
+    "replica_enabled" : False,
+    "replica_dir" : None,
+    "replica_tables" : {"product_dim" : None, "region_dim" : None, "daily_revenue" : "date"},
+    "replica_window_days" : 365,
+    "replica_refresh_delay_seconds" : 15 * 60,
+    "replica_log_path" : None,
+    "replica_log_size" : 1000
 }
\ No newline at end of file
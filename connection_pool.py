@@ -0,0 +1,275 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import snowflake.connector
+
+from conn_config import config_dict as cfg
+
+
+HOST = cfg["host"]
+PORT = cfg["port"]
+WAREHOUSE = cfg["warehouse"]
+ROLE = cfg["role"]
+
+MAX_SIZE = cfg["pool_max_size"]
+MAX_IDLE_SECONDS = cfg["pool_max_idle_seconds"]
+KEEPALIVE_SECONDS = cfg["pool_keepalive_seconds"]
+ACQUIRE_TIMEOUT = cfg["pool_acquire_timeout"]
+
+
+def snowflake_connect(**overrides: Any) -> Any:
+    """Opens a new Snowflake connection with the app's credentials and settings."""
+    params = dict(
+        user=os.environ["SNOWFLAKE_USER"],
+        password=os.environ["SNOWFLAKE_PASSWORD"],
+        account=os.environ["SNOWFLAKE_ACCOUNT"],
+        host=HOST,
+        port=PORT,
+        warehouse=WAREHOUSE,
+        role=ROLE,
+    )
+    params.update(overrides)
+    return snowflake.connector.connect(**params)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the acquire timeout."""
+
+
+class ConnectionPool:
+    """Bounded pool of Snowflake connections shared by all sessions in the process.
+
+    Idle connections are pinged before reuse once they have been idle longer
+    than the keep-alive interval and closed after max_idle_seconds. A separate
+    long-lived connection provides the session token for REST API calls.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[..., Any] = snowflake_connect,
+        max_size: int = MAX_SIZE,
+        max_idle_seconds: float = MAX_IDLE_SECONDS,
+        keepalive_seconds: float = KEEPALIVE_SECONDS,
+        acquire_timeout: float = ACQUIRE_TIMEOUT,
+    ) -> None:
+        self._connect = connect
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.keepalive_seconds = keepalive_seconds
+        self.acquire_timeout = acquire_timeout
+
+        self._idle: List[Tuple[Any, float]] = []
+        self._in_use = 0
+        # Idle connections taken out for a keep-alive ping; they still count towards max_size
+        self._pinging = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+        self._token_conn: Optional[Any] = None
+        self._token_lock = threading.Lock()
+
+        self.acquisitions = 0
+        self.created = 0
+        self.evicted = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+        self._reaper = threading.Thread(target=self._reap, name="snowflake-pool-reaper", daemon=True)
+        self._reaper.start()
+
+    # Borrowing and returning
+
+    def acquire(self) -> Any:
+        """Borrows a healthy connection, waiting up to acquire_timeout for one to free up."""
+        start = time.perf_counter()
+        deadline = start + self.acquire_timeout
+
+        with self._cond:
+            self._waiting += 1
+            try:
+                while not self._idle and self._in_use + self._pinging >= self.max_size:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        if not self._idle and self._in_use + self._pinging >= self.max_size:
+                            self.timeouts += 1
+                            raise PoolTimeout(
+                                f"No Snowflake connection available after {self.acquire_timeout}s"
+                            )
+                conn, idle_since = self._idle.pop() if self._idle else (None, 0.0)
+                self._in_use += 1
+            finally:
+                self._waiting -= 1
+
+        try:
+            idle_seconds = time.monotonic() - idle_since
+            if conn is not None and not self._is_healthy(conn, idle_seconds):
+                self._close(conn, evicted=idle_seconds > self.max_idle_seconds)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+                with self._cond:
+                    self.created += 1
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.perf_counter() - start
+        with self._cond:
+            self.acquisitions += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return conn
+
+    def release(self, conn: Any, discard: bool = False) -> None:
+        """Returns a borrowed connection; closed or discarded connections are dropped."""
+        if discard or conn.is_closed():
+            self._close(conn)
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            return
+
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Borrows a connection for the duration of the block."""
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, discard=conn.is_closed())
+            raise
+        else:
+            self.release(conn)
+
+    # Health checks and eviction
+
+    def _is_healthy(self, conn: Any, idle_seconds: float) -> bool:
+        if conn.is_closed() or idle_seconds > self.max_idle_seconds:
+            return False
+        if idle_seconds < self.keepalive_seconds:
+            return True
+        return self._ping(conn)
+
+    @staticmethod
+    def _ping(conn: Any) -> bool:
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT 1")
+                cur.fetchone()
+            finally:
+                cur.close()
+            return True
+        except Exception:
+            return False
+
+    def _close(self, conn: Any, evicted: bool = False) -> None:
+        """Closes a connection; evicted counts it as closed for being idle too long."""
+        if evicted:
+            with self._cond:
+                self.evicted += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def evict_idle(self) -> None:
+        """Closes connections idle past max_idle_seconds and pings the rest when due.
+
+        Pinged connections go back with their original idle time, so a ping
+        does not postpone their eviction.
+        """
+        now = time.monotonic()
+        with self._cond:
+            expired = [entry for entry in self._idle if now - entry[1] > self.max_idle_seconds]
+            due = [entry for entry in self._idle if self.keepalive_seconds <= now - entry[1] <= self.max_idle_seconds]
+            self._idle = [entry for entry in self._idle if entry not in expired and entry not in due]
+            self._pinging += len(due)
+
+        for conn, _ in expired:
+            self._close(conn, evicted=True)
+        for conn, idle_since in due:
+            healthy = self._ping(conn)
+            if not healthy:
+                self._close(conn)
+            with self._cond:
+                self._pinging -= 1
+                if healthy:
+                    self._idle.append((conn, idle_since))
+                self._cond.notify()
+
+    def _reap(self) -> None:
+        while True:
+            time.sleep(max(self.keepalive_seconds, 1))
+            self.evict_idle()
+
+    # REST API authentication
+
+    def token(self) -> str:
+        """Returns a valid session token for the Cortex REST APIs."""
+        with self._token_lock:
+            conn = self._token_conn
+            if conn is None or conn.is_closed() or conn.rest.token is None:
+                self._token_conn = self._connect(client_session_keep_alive=True)
+            return self._token_conn.rest.token
+
+    def refresh_token(self) -> str:
+        """Re-authenticates the token connection, e.g. after a 401 from a REST call."""
+        with self._token_lock:
+            if self._token_conn is not None:
+                self._close(self._token_conn)
+            self._token_conn = None
+        return self.token()
+
+    def close(self) -> None:
+        """Closes every idle connection and the token connection."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close(conn)
+        with self._token_lock:
+            if self._token_conn is not None:
+                self._close(self._token_conn)
+                self._token_conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns pool usage and wait-time metrics."""
+        with self._cond:
+            return {
+                "size": self._in_use + self._pinging + len(self._idle),
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "acquisitions": self.acquisitions,
+                "created": self.created,
+                "evicted": self.evicted,
+                "timeouts": self.timeouts,
+                "avg_wait_seconds": self.total_wait_seconds / self.acquisitions if self.acquisitions else 0.0,
+                "max_wait_seconds": self.max_wait_seconds,
+            }
+
+
+def default_connect() -> Callable[..., Any]:
+    """Returns the configured connection factory: Snowflake, or the local DuckDB engine."""
+    if cfg["local_engine"]:
+        # Imported here so deployments against Snowflake do not need DuckDB
+        from local_engine import local_connect
+
+        return local_connect
+    return snowflake_connect
+
+
+# Shared by every session served from this process; connections open lazily
+POOL = ConnectionPool(connect=default_connect())
@@ -0,0 +1,90 @@
+import json
+from typing import Any, Dict, List, Optional
+
+from analyst_client import user_message
+from chunked_summary import count_tokens
+from conn_config import config_dict as cfg
+
+
+HISTORY_TOKENS = cfg["analyst_history_tokens"]
+# The most recent exchanges are sent in full, older ones condensed
+FULL_EXCHANGES = cfg["analyst_history_full_exchanges"]
+
+# Content item fields the Analyst accepts back in a conversation
+_ITEM_FIELDS = {"text": ("text",), "sql": ("statement",)}
+
+
+def analyst_turn(message: Dict[str, Any], condensed: bool = False) -> Optional[Dict[str, Any]]:
+    """Converts a chat message from session state into an Analyst turn.
+
+    Assistant messages become "analyst" turns. Only text and SQL items are
+    kept, without the app's own fields (results, timings, ...). A condensed
+    analyst turn keeps just its SQL, which carries the context a follow-up
+    question needs, and drops the explanatory text.
+    """
+    role = "analyst" if message["role"] in ("assistant", "analyst") else "user"
+    content = []
+    for item in message.get("content", []):
+        fields = _ITEM_FIELDS.get(item.get("type"))
+        if fields is None or (condensed and role == "analyst" and item["type"] == "text"):
+            continue
+        content.append({"type": item["type"], **{field: item[field] for field in fields if field in item}})
+    if condensed and role == "analyst" and not content:
+        # No SQL to fall back on, keep the text
+        return analyst_turn(message)
+    return {"role": role, "content": content} if content else None
+
+
+def turn_tokens(turn: Dict[str, Any]) -> int:
+    return count_tokens(json.dumps(turn["content"], separators=(",", ":")))
+
+
+def exchanges(messages: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Pairs user messages with the assistant message that answered them.
+
+    Questions without an answer (for example a failed request) are skipped,
+    so the returned turns always alternate user, analyst.
+    """
+    pairs = []
+    for question, answer in zip(messages, messages[1:]):
+        if question["role"] == "user" and answer["role"] in ("assistant", "analyst"):
+            pairs.append([question, answer])
+    return pairs
+
+
+def build_messages(
+    history: List[Dict[str, Any]],
+    prompt: str,
+    max_tokens: int = HISTORY_TOKENS,
+    full_exchanges: int = FULL_EXCHANGES,
+) -> List[Dict[str, Any]]:
+    """Builds the Analyst messages list for a follow-up question.
+
+    Prior exchanges are added newest first while they fit in max_tokens
+    together with the new question. The latest full_exchanges are sent as
+    they were; older ones are condensed, and once the budget is used up the
+    remaining (oldest) exchanges are dropped.
+
+    Args:
+        history (List[Dict[str, Any]]): st.session_state.messages before the new question.
+        prompt (str): The new question.
+        max_tokens (int): Token budget for the whole messages list.
+        full_exchanges (int): Number of recent exchanges sent without condensing.
+
+    Returns:
+        List[Dict[str, Any]]: Alternating user/analyst turns ending with the new question.
+    """
+    question = user_message(prompt)
+    used = turn_tokens(question)
+    kept: List[Dict[str, Any]] = []
+    for age, (asked, answered) in enumerate(reversed(exchanges(history))):
+        condensed = age >= full_exchanges
+        turns = [analyst_turn(asked, condensed), analyst_turn(answered, condensed)]
+        if None in turns:
+            continue
+        tokens = sum(turn_tokens(turn) for turn in turns)
+        if used + tokens > max_tokens:
+            break
+        kept[:0] = turns
+        used += tokens
+    return kept + [question]
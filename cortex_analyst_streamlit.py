@@ -1,14 +1,22 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 import pandas as pd
-import requests
-import snowflake.connector
 import streamlit as st
 
-import os
 from dotenv import load_dotenv
 
+from admin_panel import show_admin_panel
+from analyst_client import ANALYST_CLIENT
+from analyst_stream import render_stream
+from chart_planner import chart_frame
 from conn_config import config_dict as cfg
+from conversation_history import build_messages
+from downsample import downsample_frame
+from local_replica import ROUTER
+from result_view import show_result
+from semantic_cache import SEMANTIC_CACHE, cached_response, conversation_context
+from tracing import TRACER
+from verified_queries import VERIFIED_QUERIES, verified_response
 
 
 HOST = cfg["host"]
@@ -23,49 +31,8 @@ ROLE = cfg["role"]
 #loading the user authentication credentials from .env file
 load_dotenv()
 
-# Connecting to Snowflake
-if 'CONN' not in st.session_state or st.session_state.CONN is None:
-    st.session_state.CONN = snowflake.connector.connect(
-        user=os.environ["SNOWFLAKE_USER"],
-        password=os.environ["SNOWFLAKE_PASSWORD"],
-        account=os.environ["SNOWFLAKE_ACCOUNT"],
-        
-        host=HOST,
-        port=PORT,
-        warehouse=WAREHOUSE,
-        role=ROLE,
-    )
-
-
-def send_message_to_assistant(prompt: str) -> Dict[str, Any]:
-    """Calls the REST API and returns the response."""
-
-    request_body = {
-        "messages": [{"role": "user", "content": [{"type": "text", "text": prompt}]}],
-        "semantic_model_file": f"@{DATABASE}.{SCHEMA}.{STAGE}/{FILE}",
-    }
-
-    resp = requests.post(
-        url=f"https://{HOST}/api/v2/cortex/analyst/message",
-        json=request_body,
-        headers={
-            "Authorization": f'Snowflake Token="{st.session_state.CONN.rest.token}"',
-            "Content-Type": "application/json",
-        },
-    )
-
-    request_id = resp.headers.get("X-Snowflake-Request-Id")
-    
-    if resp.status_code < 400:
-        return {**resp.json(), 
-                "request_id": request_id}  # type: ignore[arg-type]
-    
-    else:
-        raise Exception(
-            f"Failed request (id: {request_id}) with status {resp.status_code}: {resp.text}"
-        )
-
 
+@TRACER.span("process_message")
 def process_message(prompt: str) -> None:
     """Processes a message and adds the response to the chat."""
     
@@ -77,25 +44,53 @@ def process_message(prompt: str) -> None:
     with st.chat_message("user"):
         st.markdown(prompt)
 
+    results: Dict[str, Any] = {}
     with st.chat_message("assistant"):
-        with st.spinner("The assistant is working on your question..."):
-            response = send_message_to_assistant(prompt=prompt)
-            request_id = response["request_id"]
-            content = response["message"]["content"]
-            display_content(content=content, request_id=request_id)  # type: ignore[arg-type]
+        match = VERIFIED_QUERIES.match(prompt)
+        # Follow-ups depend on the conversation, so answers are shared only after the same previous turn
+        context = conversation_context(st.session_state.messages[:-1])
+        hit = SEMANTIC_CACHE.lookup(prompt, context) if match is None else None
+        if match is not None:
+            # Verified questions are answered locally, without the Analyst round trip
+            response = verified_response(match)
+            st.caption(
+                f"Verified query \"{match['name']}\" (match {match['score']:.0%}), "
+                f"about {match['saved_seconds']:.1f} s faster than asking the Analyst"
+            )
+            display_content(content=response["message"]["content"], results=results)
+        elif hit is not None:
+            # A paraphrase of an earlier question reuses that answer
+            response = cached_response(hit)
+            st.caption(
+                f"Same question as \"{hit['question']}\" (similarity {hit['similarity']:.0%}), "
+                "answered from the semantic cache"
+            )
+            display_content(content=response["message"]["content"], results=results)
+        else:
+            response = render_stream(
+                # Earlier questions and answers give follow-ups their context
+                ANALYST_CLIENT.stream_message(messages=build_messages(st.session_state.messages[:-1], prompt)),
+                lambda item, on_rows: display_content(content=[item], results=results, on_rows=on_rows),  # type: ignore[list-item]
+            )
+            SEMANTIC_CACHE.add(prompt, response["message"]["content"], response["request_id"], context)
+        request_id = response["request_id"]
+        content = response["message"]["content"]
     
     st.session_state.messages.append(
         {"role": "assistant", 
          "content": content, 
-         "request_id": request_id}
+         "request_id": request_id,
+         "results": results,
+         "timings": response["timings"]}
     )
-    print(st.session_state.messages)
 
 
 def display_content(
     content: List[Dict[str, str]],
     request_id: Optional[str] = None,
     message_index: Optional[int] = None,
+    results: Optional[Dict[str, Any]] = None,
+    on_rows: Optional[Callable[[], None]] = None,
 ) -> None:
     
     """Displays a content item for a message."""
@@ -122,28 +117,43 @@ def display_content(
                 st.code(item["statement"], language="sql")
             
             with st.expander("Query Results", expanded=True):
-                with st.spinner("Running generated SQL Query..."):
-                    df = pd.read_sql(item["statement"], st.session_state.CONN)
-                    
-                    if len(df.index) > 1:
-                        data_tab, line_tab, bar_tab, area_chart_tab = st.tabs(
-                            ["Data", "Line Chart", "Bar Chart", "Area Chart"]
-                        )
-                        data_tab.dataframe(df)
-                        if len(df.columns) > 1:
-                            df = df.set_index(df.columns[0])
-                        
-                        with line_tab:
-                            st.line_chart(df)
-                        
-                        with bar_tab:
-                            st.bar_chart(df)
-
-                        with area_chart_tab:
-                            st.area_chart(df)
-                    
-                    else:
-                        st.dataframe(df)
+                show_result(
+                    ROUTER,
+                    item["statement"],
+                    results,
+                    lambda df: display_result(df, item["statement"]),
+                    show_stats=True,
+                    on_rows=on_rows,
+                )
+
+
+def display_result(df: pd.DataFrame, statement: str) -> None:
+    """Displays a query result as a table and charts."""
+    if len(df.index) > 1:
+        with TRACER.span("render_chart", rows=len(df.index)):
+            chart_df, grain = chart_frame(ROUTER, statement, df)
+            if grain:
+                st.caption(
+                    f"Charts show {len(chart_df.index):,} points aggregated by {grain} "
+                    f"from {len(df.index):,} rows."
+                )
+            data_tab, line_tab, bar_tab, area_chart_tab = st.tabs(
+                ["Data", "Line Chart", "Bar Chart", "Area Chart"]
+            )
+            data_tab.dataframe(df)
+
+            with line_tab:
+                st.line_chart(downsample_frame(chart_df))
+
+            with bar_tab:
+                st.bar_chart(chart_df)
+
+            with area_chart_tab:
+                st.area_chart(downsample_frame(chart_df))
+
+    else:
+        st.dataframe(df)
+
 
 st.set_page_config(
     page_title="AI Supply chain analyst",
@@ -169,6 +179,7 @@ st.set_page_config(
 
 st.title(cfg["assistant_name"])
 st.markdown(f"Semantic Model being used: `{FILE}`")
+show_admin_panel()
 
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -181,6 +192,7 @@ for message_index, message in enumerate(st.session_state.messages):
             content=message["content"],
             request_id=message.get("request_id"),
             message_index=message_index,
+            results=message.get("results"),
         )
 
 if user_input := st.chat_input("Please enter your question."):
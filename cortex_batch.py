@@ -0,0 +1,198 @@
+import argparse
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from conn_config import config_dict as cfg
+from connection_pool import snowflake_connect
+
+
+DATABASE = cfg["database"]
+SCHEMA = cfg["schema"]
+
+# Output column name -> builds the Cortex call for a SQL text expression
+FUNCTIONS: Dict[str, Callable[..., str]] = {
+    "sentiment": lambda text, **_: f"SNOWFLAKE.CORTEX.SENTIMENT({text})",
+    "summary": lambda text, **_: f"SNOWFLAKE.CORTEX.SUMMARIZE({text})",
+    "translation": lambda text, from_language="en", to_language="de", **_: (
+        f"SNOWFLAKE.CORTEX.TRANSLATE({text}, {literal(from_language)}, {literal(to_language)})"
+    ),
+    "keywords": lambda text, model="snowflake-arctic", **_: (
+        f"SNOWFLAKE.CORTEX.COMPLETE({literal(model)}, "
+        f"CONCAT('Provide 5 keywords from the following text: ', {text}))"
+    ),
+    "answer": lambda text, question="", **_: f"SNOWFLAKE.CORTEX.EXTRACT_ANSWER({text}, {literal(question)})",
+}
+
+
+def literal(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def source_clause(source: str, file_format: Optional[str] = None) -> str:
+    """Returns the FROM clause for a table name or a staged file (@stage/path)."""
+    if source.startswith("@"):
+        if not file_format:
+            raise ValueError("Reading a staged file needs a file format")
+        return f"{source} (FILE_FORMAT => {literal(file_format)})"
+    return source
+
+
+def select_sql(
+    source: str,
+    text_column: str,
+    key_columns: List[str],
+    functions: List[str],
+    file_format: Optional[str] = None,
+    chunk: Optional[int] = None,
+    chunks: int = 1,
+    **options: Any,
+) -> str:
+    """Builds one set-based SELECT that applies the Cortex functions to every row of the source.
+
+    With chunk given, only the rows whose key hashes to that chunk are selected,
+    so the chunks partition the source.
+    """
+    columns = list(key_columns) + [f"{FUNCTIONS[name](text_column, **options)} AS {name}" for name in functions]
+    sql = f"SELECT {', '.join(columns)}\nFROM {source_clause(source, file_format)}"
+    if chunk is not None and chunks > 1:
+        key = ", ".join(key_columns) if key_columns else text_column
+        sql += f"\nWHERE MOD(ABS(HASH({key})), {chunks}) = {chunk}"
+    return sql
+
+
+def print_progress(update: Dict[str, Any]) -> None:
+    print(
+        f"chunk {update['chunk']:>3}/{update['chunks']}: {update['chunk_rows']:>9,} rows "
+        f"in {update['chunk_seconds']:6.1f} s | total {update['rows']:>10,} rows, "
+        f"{update['rows_per_second']:8.1f} rows/s"
+    )
+
+
+def run_batch(
+    conn: Any,
+    source: str,
+    output: str,
+    text_column: str,
+    key_columns: List[str],
+    functions: List[str],
+    chunks: int = 10,
+    append: bool = False,
+    file_format: Optional[str] = None,
+    progress: Callable[[Dict[str, Any]], None] = print_progress,
+    **options: Any,
+) -> Dict[str, Any]:
+    """Scores a table or staged file with Cortex functions inside Snowflake, writing to an output table.
+
+    Each chunk is a single INSERT ... SELECT, so the rows never leave the
+    warehouse. progress() receives a dict after every chunk with the rows
+    written so far and the throughput.
+
+    Returns:
+        Dict[str, Any]: Rows written, elapsed seconds and rows per second.
+    """
+    def select(chunk: Optional[int] = None) -> str:
+        return select_sql(source, text_column, key_columns, functions, file_format, chunk, chunks, **options)
+
+    cur = conn.cursor()
+    try:
+        if not append:
+            # Creates the output table with the result's column types, without scoring any rows
+            cur.execute(f"CREATE OR REPLACE TABLE {output} AS\n{select()}\nLIMIT 0")
+
+        start = time.perf_counter()
+        rows = 0
+        for chunk in range(chunks):
+            chunk_start = time.perf_counter()
+            cur.execute(f"INSERT INTO {output}\n{select(chunk if chunks > 1 else None)}")
+            chunk_rows = cur.rowcount or 0
+            rows += chunk_rows
+            elapsed = time.perf_counter() - start
+            progress(
+                {
+                    "chunk": chunk + 1,
+                    "chunks": chunks,
+                    "chunk_rows": chunk_rows,
+                    "chunk_seconds": time.perf_counter() - chunk_start,
+                    "rows": rows,
+                    "seconds": elapsed,
+                    "rows_per_second": rows / elapsed if elapsed else 0.0,
+                    "query_id": cur.sfqid,
+                }
+            )
+    finally:
+        cur.close()
+
+    elapsed = time.perf_counter() - start
+    return {"rows": rows, "seconds": elapsed, "rows_per_second": rows / elapsed if elapsed else 0.0}
+
+
+def per_row_rate(
+    conn: Any,
+    source: str,
+    text_column: str,
+    functions: List[str],
+    sample: int,
+    file_format: Optional[str] = None,
+    **options: Any,
+) -> Dict[str, Any]:
+    """Measures the old path for comparison: fetch texts, then one Cortex call per string."""
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT {text_column} FROM {source_clause(source, file_format)} LIMIT {int(sample)}")
+        texts = [row[0] for row in cur.fetchall()]
+        expressions = ", ".join(FUNCTIONS[name]("%(text)s", **options) for name in functions)
+        start = time.perf_counter()
+        for text in texts:
+            cur.execute(f"SELECT {expressions}", {"text": text})
+            cur.fetchall()
+        elapsed = time.perf_counter() - start
+    finally:
+        cur.close()
+    return {"rows": len(texts), "seconds": elapsed, "rows_per_second": len(texts) / elapsed if elapsed else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a table or staged file with Snowflake Cortex in SQL.")
+    parser.add_argument("source", help="Table name, or a staged file such as @raw_data/reviews.csv")
+    parser.add_argument("output", help="Output table")
+    parser.add_argument("--text-column", required=True, help="Column (or $n for staged files) holding the text")
+    parser.add_argument("--key-columns", nargs="*", default=[], help="Columns copied to the output to join back on")
+    parser.add_argument("--functions", nargs="+", choices=sorted(FUNCTIONS), default=["sentiment"])
+    parser.add_argument("--chunks", type=int, default=10, help="Number of INSERT statements, for progress reporting")
+    parser.add_argument("--append", action="store_true", help="Insert into an existing output table")
+    parser.add_argument("--file-format", help="Named file format for staged files")
+    parser.add_argument("--from-language", default="en")
+    parser.add_argument("--to-language", default="de")
+    parser.add_argument("--model", default="snowflake-arctic")
+    parser.add_argument("--question", default="")
+    parser.add_argument("--compare-sample", type=int, default=0,
+                        help="Also time the per-string path on this many rows")
+    args = parser.parse_args()
+
+    options = dict(
+        from_language=args.from_language, to_language=args.to_language, model=args.model, question=args.question
+    )
+    conn = snowflake_connect(database=DATABASE, schema=SCHEMA)
+    try:
+        total = run_batch(
+            conn, args.source, args.output, args.text_column, args.key_columns, args.functions,
+            chunks=args.chunks, append=args.append, file_format=args.file_format, **options,
+        )
+        print(f"\nSet-based: {total['rows']:,} rows in {total['seconds']:.1f} s "
+              f"({total['rows_per_second']:.1f} rows/s)")
+
+        if args.compare_sample:
+            baseline = per_row_rate(
+                conn, args.source, args.text_column, args.functions, args.compare_sample,
+                file_format=args.file_format, **options,
+            )
+            print(f"Per-string: {baseline['rows']:,} rows in {baseline['seconds']:.1f} s "
+                  f"({baseline['rows_per_second']:.1f} rows/s)")
+            if baseline["rows_per_second"]:
+                print(f"Speedup: {total['rows_per_second'] / baseline['rows_per_second']:.1f}x")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import json
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from conn_config import config_dict as cfg
+
+
+MAX_CHARS = cfg["digest_max_chars"]
+TOP_K = 5
+EXTREME_ROWS = 3
+MAX_COLUMNS = 20
+# Results this small are included in full alongside the statistics
+FULL_ROWS = 20
+
+
+def _scalar(value: Any) -> Any:
+    """Converts NumPy/pandas scalars to JSON-friendly Python values."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return str(pd.Timestamp(value).date()) if pd.Timestamp(value).normalize() == pd.Timestamp(value) else str(value)
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        return round(value, 4)
+    return value
+
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    return [{str(key): _scalar(value) for key, value in row.items()} for row in df.to_dict(orient="records")]
+
+
+def time_axis(df: pd.DataFrame) -> Optional[str]:
+    """Returns the first column that holds dates, if any."""
+    for column in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[column]):
+            return column
+        if df[column].dtype == object:
+            parsed = pd.to_datetime(df[column], errors="coerce")
+            if len(parsed) and parsed.notna().mean() > 0.9:
+                return column
+    return None
+
+
+def column_stats(series: pd.Series, top_k: int = TOP_K) -> Dict[str, Any]:
+    """Summarizes one column according to its type."""
+    stats: Dict[str, Any] = {"nulls": int(series.isna().sum())}
+    if pd.api.types.is_bool_dtype(series):
+        stats["true"] = int(series.sum())
+    elif pd.api.types.is_numeric_dtype(series):
+        described = series.describe()
+        stats.update(
+            {
+                "min": _scalar(described.get("min")),
+                "max": _scalar(described.get("max")),
+                "mean": _scalar(described.get("mean")),
+                "median": _scalar(series.median()),
+                "std": _scalar(described.get("std")),
+                "sum": _scalar(series.sum()),
+            }
+        )
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        stats.update({"min": _scalar(series.min()), "max": _scalar(series.max())})
+    else:
+        counts = series.astype(str).value_counts()
+        stats["distinct"] = int(counts.size)
+        stats["top"] = {str(value): int(count) for value, count in counts.head(top_k).items()}
+    return stats
+
+
+def trends(df: pd.DataFrame, date_column: str, measures: List[str]) -> Dict[str, Any]:
+    """Computes per-measure trend slopes and the latest period-over-period change."""
+    frame = df.assign(**{date_column: pd.to_datetime(df[date_column], errors="coerce")})
+    frame = frame.dropna(subset=[date_column]).sort_values(date_column)
+    if frame.empty:
+        return {}
+
+    span_days = (frame[date_column].max() - frame[date_column].min()).days
+    period, freq = ("month", "MS") if span_days > 90 else ("week", "W") if span_days > 14 else ("day", "D")
+    indexed = frame.set_index(date_column)
+    totals = indexed[measures].resample(freq).sum()
+    observed_days = indexed.index.normalize().to_series().resample(freq).nunique()
+    days = (frame[date_column] - frame[date_column].min()).dt.days.to_numpy(dtype=np.float64)
+
+    result: Dict[str, Any] = {"period": period, "span_days": span_days, "measures": {}}
+    if len(observed_days.index) > 1 and observed_days.iloc[-1] < observed_days.iloc[-2]:
+        # The latest period has fewer days of data than the one before it
+        result["last_period_partial"] = True
+    for measure in measures:
+        values = frame[measure].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(values)
+        entry: Dict[str, Any] = {}
+        if valid.sum() > 1 and np.ptp(days[valid]) > 0:
+            entry["slope_per_day"] = _scalar(np.polyfit(days[valid], values[valid], 1)[0])
+        if len(totals.index) > 1:
+            last, previous = totals[measure].iloc[-1], totals[measure].iloc[-2]
+            entry[f"last_{period}"] = _scalar(last)
+            entry[f"previous_{period}"] = _scalar(previous)
+            entry["change_pct"] = _scalar((last - previous) / abs(previous) * 100) if previous else None
+            entry[f"first_{period}"] = _scalar(totals[measure].iloc[0])
+        result["measures"][str(measure)] = entry
+    return result
+
+
+def build_digest(df: pd.DataFrame, top_k: int = TOP_K, extreme_rows: int = EXTREME_ROWS) -> Dict[str, Any]:
+    """Builds a bounded-size statistical summary of a query result."""
+    if not isinstance(df.index, pd.RangeIndex):
+        df = df.reset_index()
+    truncated_columns = max(len(df.columns) - MAX_COLUMNS, 0)
+    df = df.iloc[:, :MAX_COLUMNS]
+
+    measures = [
+        column for column in df.columns
+        if pd.api.types.is_numeric_dtype(df[column])
+        and not pd.api.types.is_bool_dtype(df[column])
+        and not str(column).lower().endswith("_id")
+    ]
+    digest: Dict[str, Any] = {
+        "rows": len(df.index),
+        "columns": {str(column): column_stats(df[column], top_k) for column in df.columns},
+    }
+    if truncated_columns:
+        digest["columns_omitted"] = truncated_columns
+
+    date_column = time_axis(df)
+    if date_column is not None and measures:
+        digest["time_column"] = str(date_column)
+        digest["trends"] = trends(df, date_column, measures)
+
+    if len(df.index) <= FULL_ROWS:
+        digest["data"] = _records(df)
+    else:
+        digest["extremes"] = {
+            str(measure): {
+                "highest": _records(df.nlargest(extreme_rows, measure)),
+                "lowest": _records(df.nsmallest(extreme_rows, measure)),
+            }
+            for measure in measures[:3]
+        }
+        digest["sample"] = _records(df.head(3))
+    return digest
+
+
+def digest_text(df: pd.DataFrame, max_chars: int = MAX_CHARS) -> str:
+    """Returns the digest as compact JSON, dropping the bulkiest parts to fit max_chars.
+
+    The sample and extreme rows go first, then rows of the data from the
+    end, the trends and finally column statistics from the last column
+    back, so the text stays valid JSON.
+    """
+    digest = build_digest(df)
+
+    def dumps() -> str:
+        return json.dumps(digest, separators=(",", ":"), default=str)
+
+    text = dumps()
+    for optional in ("sample", "extremes"):
+        if len(text) > max_chars and optional in digest:
+            digest.pop(optional)
+            text = dumps()
+
+    rows = digest.get("data")
+    while rows and len(text) > max_chars:
+        rows.pop()
+        digest["data_rows_omitted"] = digest["rows"] - len(rows)
+        if not rows:
+            digest.pop("data")
+        text = dumps()
+
+    if len(text) > max_chars and "trends" in digest:
+        digest.pop("trends")
+        text = dumps()
+
+    columns = digest["columns"]
+    while columns and len(text) > max_chars:
+        columns.popitem()
+        digest["columns_omitted"] = digest.get("columns_omitted", 0) + 1
+        text = dumps()
+    return text
+
+
+def insight_prompt(question: str, df: pd.DataFrame) -> str:
+    """Builds the insight prompt from the dataset digest instead of the raw rows."""
+    return (
+        f"The user has asked the following question: '{question}'. "
+        "Below is a statistical summary of the dataset retrieved to address the question: "
+        "per-column statistics, top categories, trend slopes, the latest period-over-period "
+        "change and the extreme rows (or all rows when the result is small). "
+        "Analyze it, extract meaningful insights, and present a concise response:\n\n"
+        f"Dataset summary:\n{digest_text(df)}"
+    )
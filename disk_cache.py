@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+# Default directory for the on-disk caches
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "scm_demo_cache")
+
+
+class DiskCache:
+    """Thread-safe key/value store in SQLite, bounded by the total size of its values.
+
+    The least recently used entries are evicted when a new value would exceed
+    max_bytes, and with ttl_seconds set entries expire that long after they
+    were stored. The database runs in WAL mode, so readers are not blocked by
+    a writer and the file can be shared by several processes serving the app.
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl_seconds: Optional[float] = None) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._db.commit()
+
+    def get(self, key: str, count: bool = True) -> Optional[Tuple[str, float]]:
+        """Returns the cached value and the time it was stored, or None.
+
+        With count=False the lookup is left out of the hit and miss counts.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is not None and self.ttl_seconds is not None and row[1] + self.ttl_seconds <= now:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._db.commit()
+                self.expirations += 1
+                row = None
+            if row is None:
+                self.misses += count
+                return None
+            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += count
+            return row[0], row[1]
+
+    def put(self, key: str, value: str) -> None:
+        """Stores a value, evicting least recently used entries to stay within budget."""
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            used = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if used + size > self.max_bytes:
+                evicted = 0
+                for old_key, old_size in self._db.execute(
+                    "SELECT key, size FROM entries ORDER BY accessed"
+                ).fetchall():
+                    self._db.execute("DELETE FROM entries WHERE key = ?", (old_key,))
+                    used -= old_size
+                    evicted += 1
+                    if used + size <= self.max_bytes:
+                        break
+                self.evictions += evicted
+            self._db.execute(
+                "INSERT INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._db.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and current usage."""
+        with self._lock:
+            entries, used = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": entries,
+                "bytes": used,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,90 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from conn_config import config_dict as cfg
+
+
+LTTB_POINTS = cfg["lttb_points"]
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Selects n_out points of a series with Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. The remaining points are split
+    into n_out - 2 buckets and from each bucket the point forming the largest
+    triangle with the previously selected point and the average of the next
+    bucket is kept. The triangle areas of a bucket are computed in one NumPy
+    operation.
+
+    Args:
+        x (np.ndarray): Sorted x values as floats.
+        y (np.ndarray): y values as floats, same length as x.
+        n_out (int): Number of points to keep.
+
+    Returns:
+        np.ndarray: Sorted positions of the selected points.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bucket boundaries over the interior points 1 .. n-2
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+
+    # Average point of every bucket, used as the third triangle vertex
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    counts = np.maximum(ends - starts, 1)
+    avg_x = np.append((cum_x[ends] - cum_x[starts]) / counts, x[-1])
+    avg_y = np.append((cum_y[ends] - cum_y[starts]) / counts, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for bucket, (start, end) in enumerate(zip(starts, ends)):
+        bx, by = x[start:end], y[start:end]
+        areas = np.abs(
+            (x[a] - avg_x[bucket + 1]) * (by - y[a]) - (x[a] - bx) * (avg_y[bucket + 1] - y[a])
+        )
+        a = start + int(np.argmax(areas)) if len(areas) else start
+        selected[bucket + 1] = a
+    return np.unique(selected)
+
+
+def index_as_float(index: pd.Index) -> np.ndarray:
+    """Converts a chart index (datetime, numeric or other) to float x positions."""
+    if isinstance(index, pd.DatetimeIndex) or pd.api.types.is_datetime64_any_dtype(index):
+        return index.asi8.astype(np.float64)
+    if pd.api.types.is_numeric_dtype(index):
+        return index.to_numpy(dtype=np.float64)
+    converted = pd.to_datetime(index, errors="coerce")
+    if not converted.isna().any():
+        return converted.asi8.astype(np.float64)
+    return np.arange(len(index), dtype=np.float64)
+
+
+def downsample_frame(df: pd.DataFrame, n_out: Optional[int] = None) -> pd.DataFrame:
+    """Reduces a chart frame (indexed by its x axis) to visually faithful points.
+
+    Every numeric column is downsampled separately with LTTB and the rows
+    selected for any column are kept, so each series keeps its own peaks and
+    troughs while all columns still share one index.
+    """
+    n_out = n_out or LTTB_POINTS
+    if len(df.index) <= n_out:
+        return df
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+
+    x = index_as_float(df.index)
+    keep = np.zeros(len(df.index), dtype=bool)
+    for column in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[column]):
+            return df
+        y = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = np.flatnonzero(~np.isnan(y))
+        keep[valid[lttb_indices(x[valid], y[valid], n_out)]] = True
+    return df.iloc[np.flatnonzero(keep)]
@@ -0,0 +1,66 @@
+import hashlib
+import os
+import re
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from conn_config import config_dict as cfg
+from disk_cache import CACHE_DIR, DiskCache
+
+
+INSIGHT_CACHE_PATH = cfg["insight_cache_path"] or os.path.join(CACHE_DIR, "insights.sqlite")
+INSIGHT_CACHE_MAX_BYTES = cfg["insight_cache_max_bytes"]
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """Returns a stable hash of a DataFrame's columns, dtypes, index and values."""
+    digest = hashlib.sha256()
+    digest.update(repr([(str(column), str(dtype)) for column, dtype in df.dtypes.items()]).encode())
+    digest.update(repr([str(name) for name in df.index.names]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def normalize_question(question: str) -> str:
+    """Lowercases a question and collapses whitespace and trailing punctuation."""
+    return re.sub(r"\s+", " ", question).strip().rstrip("?.! ").lower()
+
+
+def insight_key(df: pd.DataFrame, question: str, model: str) -> str:
+    """Returns the cache key of an insight; hashing the frame is costly, so compute it once per render."""
+    return f"{model}:{normalize_question(question)}:{frame_fingerprint(df)}"
+
+
+class InsightCache:
+    """Disk-backed cache of LLM insights, keyed on the result content, question and model."""
+
+    def __init__(self, path: str = INSIGHT_CACHE_PATH, max_bytes: int = INSIGHT_CACHE_MAX_BYTES) -> None:
+        self.store = DiskCache(path, max_bytes)
+
+    def get(self, key: str, count: bool = True) -> Optional[Tuple[str, float]]:
+        """Returns the cached insight for an insight_key and the time it was generated, or None."""
+        return self.store.get(key, count)
+
+    def put(self, key: str, insight: str) -> None:
+        self.store.put(key, insight)
+
+    def get_or_generate(self, key: str, generate: Callable[[], str]) -> Tuple[str, Optional[float]]:
+        """Returns the insight and, on a cache hit, the time it was generated.
+
+        generate() runs only on a miss; if it raises, nothing is cached. The
+        lookup is not counted, as the caller has already looked the key up.
+        """
+        cached = self.store.get(key, count=False)
+        if cached is not None:
+            return cached
+        insight = generate()
+        self.store.put(key, insight)
+        return insight, None
+
+    def stats(self) -> Dict[str, Any]:
+        return self.store.stats()
+
+
+# Shared by every session served from this process
+INSIGHT_CACHE = InsightCache()
@@ -0,0 +1,76 @@
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from conn_config import config_dict as cfg
+from insight_cache import INSIGHT_CACHE, InsightCache
+
+
+INSIGHT_WORKERS = cfg["insight_workers"]
+
+
+class InsightJobs:
+    """Runs insight generation on a background executor, one job per insight key.
+
+    Jobs are addressed by their insight_key, computed once by the caller.
+
+    Requests for an insight that is already being generated share the running
+    job, so concurrent sessions asking the same question make one LLM call.
+    generate() receives a callback for streamed tokens, and partial() returns
+    the text received so far.
+
+    Finished insights are stored in the insight cache and the job is dropped;
+    failed jobs are kept until their error has been collected with pop().
+    """
+
+    def __init__(self, cache: InsightCache = INSIGHT_CACHE, max_workers: int = INSIGHT_WORKERS) -> None:
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="insight")
+        self._jobs: Dict[str, Future] = {}
+        self._partial: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def job(self, key: str) -> Optional[Future]:
+        """Returns the running or failed job for an insight, or None."""
+        with self._lock:
+            return self._jobs.get(key)
+
+    def submit(self, key: str, generate: Callable[[Callable[[str], None]], str]) -> Future:
+        """Starts generating an insight unless a job for it is already running."""
+        with self._lock:
+            future = self._jobs.get(key)
+            if future is not None and not future.done():
+                return future
+            tokens: List[str] = []
+            # Run in the caller's context so spans opened by generate() join the caller's trace
+            context = contextvars.copy_context()
+            future = self._executor.submit(
+                context.run, self.cache.get_or_generate, key, lambda: generate(tokens.append)
+            )
+            self._jobs[key] = future
+            self._partial[key] = tokens
+        future.add_done_callback(lambda done: self._finished(key, done))
+        return future
+
+    def _finished(self, key: str, future: Future) -> None:
+        if future.exception() is None:
+            with self._lock:
+                if self._jobs.get(key) is future:
+                    del self._jobs[key]
+                    self._partial.pop(key, None)
+
+    def partial(self, key: str) -> str:
+        """Returns the text streamed so far by a running job."""
+        with self._lock:
+            tokens = self._partial.get(key, [])
+            return "".join(tokens)
+
+    def pop(self, key: str) -> Optional[Future]:
+        with self._lock:
+            self._partial.pop(key, None)
+            return self._jobs.pop(key, None)
+
+
+# Shared by every session served from this process
+INSIGHT_JOBS = InsightJobs()
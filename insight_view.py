@@ -0,0 +1,70 @@
+from datetime import datetime
+from typing import Callable
+
+import streamlit as st
+
+from conn_config import config_dict as cfg
+from insight_jobs import INSIGHT_JOBS
+
+
+INSIGHT_AUTOSTART = cfg["insight_autostart"]
+INSIGHT_POLL_SECONDS = cfg["insight_poll_seconds"]
+
+# Generates an insight, passing each streamed token to the callback
+Generate = Callable[[Callable[[str], None]], str]
+
+
+def start_insight(insight_id: str, generate: Generate) -> None:
+    """Starts generating an insight (by insight_key) in the background unless it is cached or running."""
+    # Not counted as a cache lookup; show_insight counts the one lookup of this render
+    if INSIGHT_JOBS.job(insight_id) is None and INSIGHT_JOBS.cache.get(insight_id, count=False) is None:
+        INSIGHT_JOBS.submit(insight_id, generate)
+
+
+@st.fragment(run_every=INSIGHT_POLL_SECONDS)
+def _wait_for_insight(insight_id: str) -> None:
+    """Shows the tokens streamed so far, rerunning the app once the background job has finished."""
+    future = INSIGHT_JOBS.job(insight_id)
+    if future is None or future.done():
+        st.rerun()
+    partial = INSIGHT_JOBS.partial(insight_id)
+    if partial:
+        st.markdown(partial + " ▌")
+    else:
+        st.info("Generating insight...")
+
+
+def show_insight(insight_id: str, generate: Generate, key: str) -> None:
+    """Displays the insight for a result without blocking the rest of the page.
+
+    insight_id is the result's insight_key. generate() runs on a background
+    executor, either when the user asks for the insight or, with
+    insight_autostart, as soon as the result is shown. Until it finishes the
+    tab polls the job and shows the tokens streamed so far. key must be
+    unique per displayed result.
+    """
+    future = INSIGHT_JOBS.job(insight_id)
+    if future is not None and not future.done():
+        _wait_for_insight(insight_id)
+        return
+    if future is not None and future.exception() is not None:
+        INSIGHT_JOBS.pop(insight_id)
+        st.error(f"An error occurred: {future.exception()}")
+    else:
+        cached = INSIGHT_JOBS.cache.get(insight_id)
+        if cached is not None:
+            insight, generated_at = cached
+            st.caption(f"Cached insight from {datetime.fromtimestamp(generated_at):%Y-%m-%d %H:%M}")
+            st.markdown(insight)
+            return
+        if INSIGHT_AUTOSTART:
+            INSIGHT_JOBS.submit(insight_id, generate)
+            _wait_for_insight(insight_id)
+            return
+
+    st.button(
+        "Generate insight",
+        key=f"insight_{key}",
+        on_click=INSIGHT_JOBS.submit,
+        args=(insight_id, generate),
+    )
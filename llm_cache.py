@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, Optional
+
+from conn_config import config_dict as cfg
+from disk_cache import CACHE_DIR, DiskCache
+
+
+LLM_CACHE_PATH = cfg["llm_cache_path"] or os.path.join(CACHE_DIR, "llm_responses.sqlite")
+LLM_CACHE_MAX_BYTES = cfg["llm_cache_max_bytes"]
+LLM_CACHE_TTL_SECONDS = cfg["llm_cache_ttl_seconds"]
+
+
+def _switch(name: str) -> bool:
+    """Reads a debugging switch from the environment (LLM_CACHE_BYPASS=1), else from the config."""
+    value = os.environ.get(name.upper())
+    if value is not None:
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(cfg[name])
+
+
+def response_key(model: str, prompt: Any, **params: Any) -> str:
+    """Returns a content hash of a model call: model, prompt (text or messages) and parameters."""
+    payload = json.dumps({"model": model, "prompt": prompt, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Disk-backed cache of LLM responses shared by every LLM call site.
+
+    Responses are keyed on the model, prompt and call parameters, expire
+    after ttl_seconds and are evicted least recently used first. Two switches
+    help with debugging: bypass skips the cache entirely and refresh always
+    calls the model and overwrites the cached response.
+    """
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        ttl_seconds: Optional[float] = LLM_CACHE_TTL_SECONDS,
+    ) -> None:
+        self.store = DiskCache(path, max_bytes, ttl_seconds)
+        self.bypass = _switch("llm_cache_bypass")
+        self.refresh = _switch("llm_cache_refresh")
+
+    def get(self, model: str, prompt: Any, **params: Any) -> Optional[str]:
+        if self.bypass or self.refresh:
+            return None
+        cached = self.store.get(response_key(model, prompt, **params))
+        return cached[0] if cached is not None else None
+
+    def put(self, model: str, prompt: Any, response: str, **params: Any) -> None:
+        if not self.bypass:
+            self.store.put(response_key(model, prompt, **params), response)
+
+    def cached_call(self, model: str, prompt: Any, call: Callable[[], str], **params: Any) -> str:
+        """Returns the cached response, running call() and caching its result on a miss.
+
+        Failed calls raise and are not cached.
+        """
+        response = self.get(model, prompt, **params)
+        if response is None:
+            response = call()
+            self.put(model, prompt, response, **params)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.store.stats(), "bypass": self.bypass, "refresh": self.refresh}
+
+
+# Shared by every LLM call site in this process
+LLM_CACHE = LLMCache()
@@ -0,0 +1,200 @@
+import os
+import re
+import threading
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+
+from conn_config import config_dict as cfg
+
+
+DATA_DIR = cfg["local_data_dir"]
+DATABASE = cfg["database"].lower()
+SCHEMA = cfg["schema"].lower()
+# Rows per result batch, like the chunks Snowflake splits large results into
+BATCH_ROWS = cfg["local_batch_rows"]
+
+# Tables of create_snowflake_objects.sql, loaded from the CSV files load_data.sql copies in
+TABLES = {
+    "daily_revenue": (
+        "daily_revenue.csv",
+        "CAST(DATE AS DATE) AS date, REVENUE AS revenue, COGS AS cogs, "
+        "FORECASTED_REVENUE AS forecasted_revenue, Product_id AS product_id, Region_id AS region_id",
+    ),
+    "product_dim": ("product.csv", "Product_id AS product_id, Product_line AS product_line"),
+    "region_dim": ("region.csv", "Region_id AS region_id, Region AS sales_region, State AS state"),
+}
+
+# Snowflake functions the Analyst uses that DuckDB lacks
+MACROS = [
+    "iff(condition, a, b) AS CASE WHEN condition THEN a ELSE b END",
+    "nvl(a, b) AS COALESCE(a, b)",
+    "zeroifnull(a) AS COALESCE(a, 0)",
+    "div0(a, b) AS CASE WHEN b = 0 THEN 0 ELSE a / b END",
+    "to_date(a) AS CAST(a AS DATE)",
+]
+
+_UNQUOTED = re.compile(r"^[a-z_][a-z0-9_$]*$")
+
+
+class LocalResultBatch:
+    """One chunk of a local result, with the to_arrow() of a Snowflake result batch."""
+
+    def __init__(self, table: pa.Table) -> None:
+        self._table = table
+        self.rowcount = table.num_rows
+
+    def to_arrow(self) -> pa.Table:
+        return self._table
+
+    def to_pandas(self) -> pd.DataFrame:
+        return self._table.to_pandas()
+
+
+class LocalCursor:
+    """DuckDB cursor with the parts of the Snowflake cursor API the apps use."""
+
+    def __init__(self, con: Any) -> None:
+        self._con = con
+        self._table: Optional[pa.Table] = None
+        self._position = 0
+        self.description: Optional[List[Tuple]] = None
+        self.rowcount: Optional[int] = None
+        self.sfqid: Optional[str] = None
+
+    def execute(self, statement: str, params: Optional[Any] = None) -> "LocalCursor":
+        self.sfqid = str(uuid.uuid4())
+        self._con.execute(statement, params)
+        if self._con.description is None:
+            self._table, self.description, self.rowcount = None, None, 0
+            return self
+        table = self._con.fetch_arrow_table()
+        # Snowflake returns unquoted identifiers in upper case
+        names = [name.upper() if _UNQUOTED.match(name) else name for name in table.column_names]
+        self._table = table.rename_columns(names)
+        self.description = [(name,) + tuple(column[1:]) for name, column in zip(names, self._con.description)]
+        self.rowcount = table.num_rows
+        self._position = 0
+        return self
+
+    def _batches(self) -> List[pa.Table]:
+        if self._table is None:
+            return []
+        return [pa.Table.from_batches([batch]) for batch in self._table.to_batches(max_chunksize=BATCH_ROWS)]
+
+    def fetch_arrow_batches(self) -> Iterator[pa.Table]:
+        return iter(self._batches())
+
+    def get_result_batches(self) -> List[LocalResultBatch]:
+        return [LocalResultBatch(table) for table in self._batches()]
+
+    def fetch_pandas_all(self) -> pd.DataFrame:
+        return self._table.to_pandas() if self._table is not None else pd.DataFrame()
+
+    def fetchmany(self, size: int = 1) -> List[Tuple]:
+        if self._table is None:
+            return []
+        rows = self._table.slice(self._position, size)
+        self._position += rows.num_rows
+        return list(zip(*(column.to_pylist() for column in rows.columns)))
+
+    def fetchone(self) -> Optional[Tuple]:
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchall(self) -> List[Tuple]:
+        if self._table is None:
+            return []
+        return self.fetchmany(self._table.num_rows - self._position)
+
+    def close(self) -> None:
+        self._con.close()
+
+
+class _Rest:
+    # Sent as the session token to the mock Analyst, which does not check it
+    token = "local"
+
+
+class LocalConnection:
+    """Connection to the local engine, usable wherever the pool expects a Snowflake connection."""
+
+    def __init__(self, engine: "LocalEngine") -> None:
+        self._engine = engine
+        self._closed = False
+        self.rest = _Rest()
+
+    def cursor(self) -> LocalCursor:
+        return LocalCursor(self._engine.cursor())
+
+    def is_closed(self) -> bool:
+        return self._closed
+
+    def close(self) -> None:
+        self._closed = True
+
+
+class LocalEngine:
+    """In-memory DuckDB database holding the demo tables, loaded from data/*.csv.
+
+    The tables live under the same database and schema names as in
+    Snowflake, so the fully qualified SQL the Analyst and the verified
+    queries produce runs unchanged. Every cursor is its own DuckDB
+    connection to the shared database, so concurrent sessions do not block
+    each other.
+    """
+
+    def __init__(self, data_dir: str = DATA_DIR) -> None:
+        self.data_dir = data_dir
+        self._db: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    def _create_tables(self, db: Any) -> None:
+        for table, (file, columns) in TABLES.items():
+            path = os.path.join(self.data_dir, file).replace("'", "''")
+            db.execute(f"CREATE TABLE {DATABASE}.{SCHEMA}.{table} AS SELECT {columns} FROM read_csv_auto('{path}')")
+
+    def _load(self) -> Any:
+        db = duckdb.connect(":memory:")
+        db.execute(f"ATTACH ':memory:' AS {DATABASE}")
+        db.execute(f"CREATE SCHEMA {DATABASE}.{SCHEMA}")
+        self._create_tables(db)
+        for macro in MACROS:
+            db.execute(f"CREATE MACRO {DATABASE}.{SCHEMA}.{macro}")
+        return db
+
+    def reset(self) -> None:
+        """Drops the loaded database; the next cursor loads the tables again."""
+        with self._lock:
+            self._db = None
+
+    def cursor(self) -> Any:
+        with self._lock:
+            if self._db is None:
+                self._db = self._load()
+            con = self._db.cursor()
+        con.execute(f"USE {DATABASE}.{SCHEMA}")
+        return con
+
+    def connect(self, **_: Any) -> LocalConnection:
+        """Opens a connection; Snowflake connection parameters are accepted and ignored."""
+        return LocalConnection(self)
+
+    def table_counts(self) -> Dict[str, int]:
+        cur = self.cursor()
+        try:
+            return {table: cur.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in TABLES}
+        finally:
+            cur.close()
+
+
+# Shared by every session served from this process; the CSV files load on first use
+LOCAL_ENGINE = LocalEngine()
+
+
+def local_connect(**overrides: Any) -> LocalConnection:
+    """Drop-in for snowflake_connect() that opens a connection to the local engine."""
+    return LOCAL_ENGINE.connect(**overrides)
@@ -0,0 +1,373 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from arrow_fetch import fetch_arrow
+from conn_config import config_dict as cfg
+from connection_pool import POOL
+from local_engine import DATABASE, SCHEMA, LocalCursor, LocalEngine
+from result_cache import next_data_load
+from tracing import TRACER
+
+
+REPLICA_ENABLED = cfg["replica_enabled"]
+REPLICA_DIR = cfg["replica_dir"] or os.path.join(tempfile.gettempdir(), "scm_demo_replica")
+# Replicated tables with the date column that limits them to a recent window, or None to copy them whole
+REPLICA_TABLES: Dict[str, Optional[str]] = cfg["replica_tables"]
+WINDOW_DAYS = cfg["replica_window_days"]
+# Time after the scheduled data load before the replica is refreshed
+REFRESH_DELAY_SECONDS = cfg["replica_refresh_delay_seconds"]
+LOG_PATH = cfg["replica_log_path"] or os.path.join(tempfile.gettempdir(), "scm_demo_routing.jsonl")
+LOG_SIZE = cfg["replica_log_size"]
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_][\w$]*(?:\.[A-Za-z_][\w$]*){0,2})", re.IGNORECASE)
+_CTE_NAME = re.compile(r"\b([A-Za-z_][\w$]*)\s+AS\s*\(", re.IGNORECASE)
+_DATE_LITERAL = r"(?:(?:DATE|TIMESTAMP|TO_DATE)\s*\(?\s*)?'(\d{4}-\d{2}-\d{2})[^']*'"
+# Conditions that can widen a filter past its lower bound (IS NOT NULL only narrows it)
+_WIDENING = re.compile(r"\b(?:OR|NOT)\b(?!\s+NULL\b)", re.IGNORECASE)
+# Constructs that read rows outside the WHERE filter: window functions, QUALIFY and nested selects
+_WIDE_SCOPE = re.compile(r"\bOVER\b|\bQUALIFY\b|\bSELECT\b.*\bSELECT\b", re.IGNORECASE | re.DOTALL)
+_WHERE = re.compile(
+    r"\bWHERE\b(.*?)(?:\bGROUP\s+BY\b|\bHAVING\b|\bORDER\s+BY\b|\bLIMIT\b|$)", re.IGNORECASE | re.DOTALL
+)
+# FROM inside EXTRACT(part FROM column) is not a table reference
+_EXTRACT = re.compile(r"\bEXTRACT\s*\(\s*\w+\s+FROM\b", re.IGNORECASE)
+
+
+def _lower_bounds(code: str, column: str) -> List[date]:
+    """Returns the dates a statement bounds a column from below with >, >= or BETWEEN."""
+    name = r'(?:\b[A-Za-z_][\w$]*\.)?(?:\b%s\b|"%s")' % (re.escape(column), re.escape(column.upper()))
+    patterns = (
+        rf"{name}\s*(?:>=|>)\s*{_DATE_LITERAL}",
+        rf"{_DATE_LITERAL}\s*(?:<=|<)\s*{name}",
+        rf"{name}\s+BETWEEN\s+{_DATE_LITERAL}",
+    )
+    return [
+        date.fromisoformat(value)
+        for pattern in patterns
+        for value in re.findall(pattern, code, re.IGNORECASE)
+    ]
+
+
+class ReplicaEngine(LocalEngine):
+    """Local DuckDB engine over the Parquet files of the replica."""
+
+    def __init__(self, replica_dir: str = REPLICA_DIR) -> None:
+        super().__init__(replica_dir)
+
+    def _create_tables(self, db: Any) -> None:
+        for table in REPLICA_TABLES:
+            path = os.path.join(self.data_dir, f"{table}.parquet").replace("'", "''")
+            db.execute(f"CREATE TABLE {DATABASE}.{SCHEMA}.{table} AS SELECT * FROM read_parquet('{path}')")
+
+
+class LocalReplica:
+    """Parquet copy of the small dimension tables and a recent window of the fact table.
+
+    refresh() copies each table from Snowflake; tables with a date column
+    keep only the last window_days before their latest date. The copy is
+    written next to the old one and swapped in, then queried with DuckDB.
+    A background thread refreshes the replica after each scheduled data
+    load.
+    """
+
+    def __init__(
+        self,
+        pool: Any = POOL,
+        replica_dir: str = REPLICA_DIR,
+        tables: Dict[str, Optional[str]] = REPLICA_TABLES,
+        window_days: Optional[int] = WINDOW_DAYS,
+    ) -> None:
+        self.pool = pool
+        self.replica_dir = replica_dir
+        self.tables = tables
+        self.window_days = window_days
+        self.engine = ReplicaEngine(replica_dir)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.refreshed_at: Optional[datetime] = None
+        self.refresh_seconds: Optional[float] = None
+        # First date held for each windowed table
+        self.window_start: Dict[str, date] = {}
+        self.rows: Dict[str, int] = {}
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.refreshed_at is not None
+
+    def _copy_sql(self, table: str, date_column: Optional[str]) -> str:
+        name = f"{DATABASE}.{SCHEMA}.{table}"
+        if date_column is None or self.window_days is None:
+            return f"SELECT * FROM {name}"
+        return (
+            f"SELECT * FROM {name} WHERE {date_column} >= "
+            f"(SELECT MAX({date_column}) - INTERVAL '{int(self.window_days)} days' FROM {name})"
+        )
+
+    def refresh(self) -> None:
+        """Copies every replicated table from Snowflake and swaps in the new files."""
+        start = time.perf_counter()
+        os.makedirs(self.replica_dir, exist_ok=True)
+        copied: Dict[str, pa.Table] = {}
+        with TRACER.span("refresh_replica"), self.pool.connection() as conn:
+            for table, date_column in self.tables.items():
+                copied[table], _ = fetch_arrow(conn, self._copy_sql(table, date_column))
+
+        window_start = {}
+        for table, data in copied.items():
+            # Snowflake returns upper case column names; the replica is queried case-insensitively
+            data = data.rename_columns([name.lower() for name in data.column_names])
+            date_column = self.tables[table]
+            if date_column is not None and self.window_days is not None and data.num_rows:
+                first = pc.min(data.column(date_column.lower())).as_py()
+                window_start[table] = first.date() if isinstance(first, datetime) else first
+            path = os.path.join(self.replica_dir, f"{table}.parquet")
+            pq.write_table(data, path + ".tmp")
+            os.replace(path + ".tmp", path)
+
+        with self._lock:
+            self.engine.reset()
+            self.window_start = window_start
+            self.rows = {table: data.num_rows for table, data in copied.items()}
+            self.refreshed_at = datetime.now(timezone.utc)
+            self.refresh_seconds = time.perf_counter() - start
+            self.error = None
+
+    def _refresh_loop(self) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+            wait = next_data_load() + timedelta(seconds=REFRESH_DELAY_SECONDS) - datetime.now(timezone.utc)
+            time.sleep(max(wait.total_seconds(), 60))
+
+    def start(self) -> None:
+        """Starts the background refresh thread, once."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._refresh_loop, name="replica-refresh", daemon=True)
+                self._thread.start()
+
+    def can_run(self, statement: str) -> Tuple[bool, str]:
+        """Decides whether a statement can run on the replica, with the reason.
+
+        It can when the replica is loaded, the statement is a single SELECT
+        reading only replicated tables, and each windowed table is limited
+        by a lower bound in the WHERE clause on its date column inside the
+        replicated window. Filters with OR or NOT could reach past that
+        bound, and window functions, QUALIFY and subqueries or CTEs could
+        read rows before it, so those statements go to Snowflake.
+        """
+        if not self.ready:
+            return False, "replica not loaded"
+        code = _COMMENTS.sub(" ", statement)
+        masked = _EXTRACT.sub("EXTRACT(", _LITERALS.sub("''", code)).strip().rstrip(";").strip()
+        if ";" in masked:
+            return False, "multiple statements"
+        if not re.match(r"(SELECT|WITH)\b", masked, re.IGNORECASE):
+            return False, "not a query"
+
+        ctes = {name.lower() for name in _CTE_NAME.findall(masked)}
+        tables = set()
+        for reference in _TABLE_REFERENCE.findall(masked):
+            parts = reference.lower().split(".")
+            if len(parts) == 1 and parts[0] in ctes:
+                continue
+            if parts[:-1] not in ([], [SCHEMA], [DATABASE, SCHEMA]) or parts[-1] not in self.tables:
+                return False, f"{reference} is not replicated"
+            tables.add(parts[-1])
+        if not tables:
+            return False, "no replicated table"
+
+        windowed = [table for table in tables if table in self.window_start]
+        if windowed:
+            if _WIDE_SCOPE.search(masked):
+                return False, "window function, QUALIFY or subquery over a windowed table"
+            if _WIDENING.search(masked):
+                return False, "OR/NOT filter on a windowed table"
+            # Literals blanked to the same length, so WHERE is found in the statement itself
+            blanked = _LITERALS.sub(lambda literal: "'" + " " * (len(literal.group()) - 2) + "'", code)
+            where = _WHERE.search(blanked)
+            if where is None:
+                return False, "no date filter on a windowed table"
+            for table in windowed:
+                bounds = _lower_bounds(code[where.start(1):where.end(1)], self.tables[table])
+                if not bounds:
+                    return False, f"no lower bound on {table}.{self.tables[table]}"
+                start = self.window_start[table]
+                if max(bounds) < start:
+                    return False, f"dates before the replicated window ({start.isoformat()})"
+        return True, "replicated tables" + (" in window" if windowed else "")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "refreshed_at": self.refreshed_at,
+            "refresh_seconds": self.refresh_seconds,
+            "rows": dict(self.rows),
+            "window_start": {table: start.isoformat() for table, start in self.window_start.items()},
+            "error": self.error,
+        }
+
+
+class RoutingCursor:
+    """Cursor that runs each statement on the replica when it can and on Snowflake otherwise.
+
+    A statement that fails on the replica (for example a Snowflake function
+    DuckDB lacks) is retried on Snowflake. The Snowflake connection is
+    borrowed from the pool only for statements that need it, until the
+    cursor is closed.
+    """
+
+    def __init__(self, router: "ReplicaRouter") -> None:
+        self._router = router
+        self._cursor: Any = None
+        self._conn: Any = None
+        self._decision: Optional[Dict[str, Any]] = None
+        self._start = 0.0
+
+    def execute(self, statement: str, *args: Any, **kwargs: Any) -> "RoutingCursor":
+        self._close_current()
+        self._start = time.perf_counter()
+        local, reason = self._router.route(statement)
+        if local:
+            cursor = LocalCursor(self._router.replica.engine.cursor())
+            try:
+                cursor.execute(statement, *args, **kwargs)
+                self._cursor = cursor
+            except Exception as e:
+                cursor.close()
+                local, reason = False, f"replica failed: {type(e).__name__}"
+        if not local:
+            self._conn = self._router.pool.acquire()
+            self._cursor = self._conn.cursor()
+            self._cursor.execute(statement, *args, **kwargs)
+        target = "replica" if local else "snowflake"
+        TRACER.annotate(route=target)
+        self._decision = {"statement": statement, "target": target, "reason": reason}
+        return self
+
+    def __getattr__(self, name: str) -> Any:
+        # Result access (fetch_arrow_batches, get_result_batches, description, sfqid, ...)
+        return getattr(self._cursor, name)
+
+    def _close_current(self) -> None:
+        if self._decision is not None:
+            self._router.record(**self._decision, seconds=time.perf_counter() - self._start,
+                                query_id=getattr(self._cursor, "sfqid", None))
+            self._decision = None
+        if self._cursor is not None:
+            self._cursor.close()
+            self._cursor = None
+        if self._conn is not None:
+            self._router.pool.release(self._conn)
+            self._conn = None
+
+    def close(self) -> None:
+        self._close_current()
+
+
+class RoutingConnection:
+    """Connection handed out by the router; see RoutingCursor."""
+
+    def __init__(self, router: "ReplicaRouter") -> None:
+        self._router = router
+
+    def cursor(self) -> RoutingCursor:
+        return RoutingCursor(self._router)
+
+    def is_closed(self) -> bool:
+        return False
+
+
+class ReplicaRouter:
+    """Pool stand-in that routes each query to the local replica or to Snowflake.
+
+    Pass it wherever the apps pass POOL to run Analyst SQL. Every query is
+    recorded in a routing log with where it ran, why and how long it took;
+    the log is kept in memory for stats() and appended to a JSONL file.
+    With the replica disabled every query goes to Snowflake.
+    """
+
+    def __init__(
+        self,
+        pool: Any = POOL,
+        replica: Optional[LocalReplica] = None,
+        enabled: bool = REPLICA_ENABLED,
+        log_path: Optional[str] = LOG_PATH,
+        log_size: int = LOG_SIZE,
+    ) -> None:
+        self.pool = pool
+        self.replica = replica or LocalReplica(pool)
+        self.enabled = enabled
+        self.log_path = log_path
+        self.decisions: Deque[Dict[str, Any]] = deque(maxlen=log_size)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self) -> Iterator[RoutingConnection]:
+        yield RoutingConnection(self)
+
+    def route(self, statement: str) -> Tuple[bool, str]:
+        """Returns whether to run a statement on the replica, and why."""
+        if not self.enabled:
+            return False, "replica disabled"
+        self.replica.start()
+        return self.replica.can_run(statement)
+
+    def record(self, statement: str, target: str, reason: str, seconds: float, query_id: Optional[str]) -> None:
+        decision = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "target": target,
+            "reason": reason,
+            "seconds": seconds,
+            "query_id": query_id,
+            "statement": statement,
+        }
+        with self._lock:
+            self.decisions.append(decision)
+            if self.log_path:
+                os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(decision) + "\n")
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the number of queries and p50 latency per target over the recent decisions."""
+        with self._lock:
+            decisions = list(self.decisions)
+        stats: Dict[str, Any] = {}
+        for target in ("replica", "snowflake"):
+            seconds = sorted(decision["seconds"] for decision in decisions if decision["target"] == target)
+            stats[target] = {
+                "queries": len(seconds),
+                "p50_seconds": seconds[len(seconds) // 2] if seconds else 0.0,
+            }
+        return stats
+
+    def recent(self, count: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.decisions)[-count:]
+
+    def decision(self, query_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the logged decision for a query id, if still in the recent decisions."""
+        with self._lock:
+            return next((decision for decision in reversed(self.decisions) if decision["query_id"] == query_id), None)
+
+
+# Shared by every session served from this process; the replica refreshes in the background once enabled
+ROUTER = ReplicaRouter()
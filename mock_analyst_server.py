@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from analyst_client import ANALYST_CLIENT, MESSAGE_PATH
+from conn_config import config_dict as cfg
+from semantic_model import verified_queries
+from sql_templates import normalize_question
+from verified_queries import VERIFIED_QUERIES, match_score, verified_response
+
+
+PORT = cfg["mock_analyst_port"]
+FIXTURES_PATH = cfg["mock_analyst_fixtures"]
+# Simulated Analyst think time before the first event, and delay between streamed chunks
+LATENCY_SECONDS = cfg["mock_analyst_latency_seconds"]
+CHUNK_SECONDS = cfg["mock_analyst_chunk_seconds"]
+FIXTURE_THRESHOLD = cfg["verified_query_threshold"]
+
+
+def load_fixtures(path: str = FIXTURES_PATH) -> List[Dict[str, Any]]:
+    """Reads recorded Analyst answers: a JSON list of {question, content, request_id}."""
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def record_fixtures(questions: List[str], path: str = FIXTURES_PATH) -> None:
+    """Asks the configured Analyst each question and adds its answer to the fixtures file."""
+    fixtures = {normalize_question(fixture["question"]): fixture for fixture in load_fixtures(path)}
+    for question in questions:
+        response = ANALYST_CLIENT.send_message(prompt=question)
+        fixtures[normalize_question(question)] = {
+            "question": question,
+            "content": response["message"]["content"],
+            "request_id": response["request_id"],
+        }
+        print(f"Recorded {question!r} ({response['request_id']})")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(list(fixtures.values()), f, indent=2)
+
+
+class MockAnalyst:
+    """Answers Analyst questions from recorded fixtures, then from the verified queries.
+
+    Fixtures are matched with the same fuzzy score as the verified queries.
+    Questions matching neither get a text answer with suggestions and no
+    SQL, as the Analyst gives for questions it cannot answer.
+    """
+
+    def __init__(self, fixtures: Optional[List[Dict[str, Any]]] = None) -> None:
+        self.fixtures = [
+            {**fixture, "normalized": normalize_question(fixture["question"])}
+            for fixture in (load_fixtures() if fixtures is None else fixtures)
+        ]
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def answer(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Returns the content items answering the last user turn."""
+        with self._lock:
+            self.requests += 1
+        question = " ".join(
+            item.get("text", "") for item in messages[-1].get("content", []) if item.get("type") == "text"
+        )
+        normalized = normalize_question(question)
+        scored = [(match_score(normalized, fixture["normalized"]), fixture) for fixture in self.fixtures]
+        if scored:
+            score, fixture = max(scored, key=lambda pair: pair[0])
+            if score >= FIXTURE_THRESHOLD:
+                return fixture["content"]
+        match = VERIFIED_QUERIES.match(question)
+        if match is not None:
+            return verified_response(match)["message"]["content"]
+        return unanswered()
+
+
+def unanswered() -> List[Dict[str, Any]]:
+    """Content for a question the mock cannot answer, suggesting verified questions instead."""
+    return [
+        {
+            "type": "text",
+            "text": "I can only answer questions recorded as fixtures or covered by the verified queries.",
+        },
+        {"type": "suggestions", "suggestions": [query["question"] for query in verified_queries()[:3]]},
+    ]
+
+
+def _chunks(text: str, words: int = 4) -> Iterator[str]:
+    parts = text.split(" ")
+    for start in range(0, len(parts), words):
+        yield " ".join(parts[start:start + words]) + (" " if start + words < len(parts) else "")
+
+
+def stream_events(content: List[Dict[str, Any]], request_id: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yields the (event, data) pairs of a streamed Analyst answer, in the service's SSE format."""
+    yield "status", {"status": "interpreting_question", "status_message": "Interpreting question"}
+    for index, item in enumerate(content):
+        if item["type"] == "text":
+            for chunk in _chunks(item["text"]):
+                yield "message.content.delta", {"index": index, "type": "text", "text_delta": chunk}
+        elif item["type"] == "sql":
+            yield "status", {"status": "generating_sql", "status_message": "Generating SQL"}
+            delta = {"index": index, "type": "sql", "statement_delta": item["statement"]}
+            if "confidence" in item:
+                delta["confidence"] = item["confidence"]
+            yield "message.content.delta", delta
+        elif item["type"] == "suggestions":
+            for position, suggestion in enumerate(item["suggestions"]):
+                yield "message.content.delta", {
+                    "index": index,
+                    "type": "suggestions",
+                    "suggestions_delta": {"index": position, "suggestion_delta": suggestion},
+                }
+    yield "status", {"status": "done", "status_message": "Done"}
+    yield "done", {"request_id": request_id}
+
+
+class MockAnalystHandler(BaseHTTPRequestHandler):
+    """Serves the Cortex Analyst message endpoint, streamed or not."""
+
+    analyst: MockAnalyst
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any], request_id: str) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("X-Snowflake-Request-Id", request_id)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self) -> None:
+        request_id = str(uuid.uuid4())
+        if self.path != MESSAGE_PATH:
+            self._send_json(404, {"message": f"Unknown path {self.path}", "request_id": request_id}, request_id)
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            content = self.analyst.answer(body["messages"])
+        except (ValueError, KeyError, IndexError) as e:
+            self._send_json(400, {"message": f"Invalid request: {e}", "request_id": request_id}, request_id)
+            return
+
+        time.sleep(LATENCY_SECONDS)
+        if not body.get("stream"):
+            message = {"role": "analyst", "content": content}
+            self._send_json(200, {"message": message, "request_id": request_id, "warnings": []}, request_id)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("X-Snowflake-Request-Id", request_id)
+        # No Content-Length, so the stream ends with the connection
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for event, data in stream_events(content, request_id):
+            self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            if event == "message.content.delta":
+                time.sleep(CHUNK_SECONDS)
+        self.close_connection = True
+
+
+def serve(port: int = PORT, fixtures_path: str = FIXTURES_PATH) -> ThreadingHTTPServer:
+    """Starts the mock Analyst on a background thread and returns the server."""
+    handler = type("Handler", (MockAnalystHandler,), {"analyst": MockAnalyst(load_fixtures(fixtures_path))})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, name="mock-analyst", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Cortex Analyst message endpoint.")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--fixtures", default=FIXTURES_PATH, help="JSON file of recorded answers")
+    parser.add_argument("--record", nargs="+", metavar="QUESTION",
+                        help="Ask the configured Analyst these questions and save the answers as fixtures")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(args.record, args.fixtures)
+        return
+    server = serve(args.port, args.fixtures)
+    print(f"Mock Cortex Analyst on http://127.0.0.1:{args.port}{MESSAGE_PATH} "
+          f"({len(server.RequestHandlerClass.analyst.fixtures)} fixtures)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
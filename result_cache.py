@@ -0,0 +1,143 @@
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from conn_config import config_dict as cfg
+from semantic_model import semantic_model_version
+
+
+MAX_BYTES = cfg["result_cache_max_bytes"]
+DATA_LOAD_SCHEDULE = cfg["data_load_schedule"]
+
+# Splits a statement into quoted literals/identifiers and everything in between
+_QUOTED = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+
+
+def normalize_sql(statement: str) -> str:
+    """Normalizes whitespace, case and trailing semicolons outside of quoted literals."""
+    parts = _QUOTED.split(statement.strip().rstrip(";").strip())
+    normalized = []
+    for index, part in enumerate(parts):
+        if index % 2:
+            normalized.append(part)
+        else:
+            part = re.sub(r"--[^\n]*", " ", part)
+            normalized.append(re.sub(r"\s+", " ", part).lower())
+    return "".join(normalized).strip()
+
+
+def next_data_load(now: Optional[datetime] = None) -> datetime:
+    """Returns the next time (UTC) the daily data load is scheduled to run."""
+    now = now or datetime.now(timezone.utc)
+    hour, minute = (int(value) for value in DATA_LOAD_SCHEDULE.split(":"))
+    load_time = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if load_time <= now:
+        load_time += timedelta(days=1)
+    return load_time
+
+
+def result_size(result: Any) -> int:
+    """Returns the size of a cached result (DataFrame or ResultHandle) in bytes."""
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(index=True, deep=True).sum())
+    return result.nbytes
+
+
+class ResultCache:
+    """Thread-safe LRU cache of query results, bounded by memory size.
+
+    Entries are keyed on the normalized SQL statement plus the semantic model
+    version and expire at the next scheduled data load.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = MAX_BYTES,
+        expires_at: Callable[[], datetime] = next_data_load,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self._expires_at = expires_at
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, int, datetime]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _key(self, statement: str) -> Tuple[str, str]:
+        return (normalize_sql(statement), semantic_model_version())
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, statement: str) -> Optional[Any]:
+        """Returns the cached result for a statement, or None."""
+        key = self._key(statement)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] <= datetime.now(timezone.utc):
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, statement: str, result: Any) -> None:
+        """Stores a result, evicting least recently used entries to stay within budget."""
+        size = result_size(result)
+        if size > self.max_bytes:
+            return
+        key = self._key(statement)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            while self._entries and self._bytes + size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[key] = (result, size, self._expires_at())
+            self._bytes += size
+
+    def get_or_fetch(self, statement: str, fetch: Callable[[], Any]) -> Any:
+        """Returns the cached result, running fetch() and caching its result on a miss.
+
+        Cached results are shared between sessions and must not be modified in place.
+        """
+        result = self.get(statement)
+        if result is None:
+            result = fetch()
+            self.put(statement, result)
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and current usage."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# Shared by every session served from this process
+RESULT_CACHE = ResultCache()
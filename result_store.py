@@ -0,0 +1,93 @@
+import os
+import tempfile
+import uuid
+import weakref
+from typing import Any, Dict, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from arrow_fetch import arrow_to_pandas, fetch_arrow
+from conn_config import config_dict as cfg
+from result_cache import RESULT_CACHE
+
+
+SPILL_BYTES = cfg["result_spill_bytes"]
+SPILL_DIR = cfg["result_spill_dir"] or os.path.join(tempfile.gettempdir(), "scm_demo_results")
+
+
+class ResultHandle:
+    """Materialized result of a query.
+
+    Small results are kept in memory as an Arrow table; larger ones are spilled
+    to a Parquet file that is removed once the handle is garbage collected.
+    """
+
+    def __init__(
+        self,
+        statement: str,
+        table: pa.Table,
+        query_id: Optional[str] = None,
+        fetch_stats: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.statement = statement
+        self.query_id = query_id
+        self.fetch_stats = fetch_stats
+        self.num_rows = table.num_rows
+        self.nbytes = table.nbytes
+        self.path: Optional[str] = None
+        self._table: Optional[pa.Table] = table
+
+        if self.nbytes > SPILL_BYTES:
+            self._spill()
+
+    def _spill(self) -> None:
+        os.makedirs(SPILL_DIR, exist_ok=True)
+        self.path = os.path.join(SPILL_DIR, f"{self.query_id or uuid.uuid4().hex}.parquet")
+        pq.write_table(self._table, self.path)
+        self._table = None
+        weakref.finalize(self, _remove_file, self.path)
+
+    @property
+    def table(self) -> pa.Table:
+        """Returns the result as an Arrow table, reading it back from disk if spilled."""
+        if self._table is not None:
+            return self._table
+        return pq.read_table(self.path)
+
+    def to_pandas(self) -> pd.DataFrame:
+        return arrow_to_pandas(self.table)
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def fetch_result(conn: Any, statement: str) -> ResultHandle:
+    """Runs a statement and materializes its result."""
+    table, stats = fetch_arrow(conn, statement)
+    return ResultHandle(statement, table, query_id=stats["query_id"], fetch_stats=stats)
+
+
+def get_result(pool: Any, statement: str, results: Optional[Dict[str, ResultHandle]] = None) -> ResultHandle:
+    """Returns the result for a statement without re-querying when possible.
+
+    Looks in the message's stored results first, then the shared result cache,
+    and only then runs the statement on a connection borrowed from the pool.
+    The handle is recorded in results.
+    """
+    if results is not None and statement in results:
+        return results[statement]
+
+    def fetch() -> ResultHandle:
+        with pool.connection() as conn:
+            return fetch_result(conn, statement)
+
+    handle = RESULT_CACHE.get_or_fetch(statement, fetch)
+    if results is not None:
+        results[statement] = handle
+    return handle
@@ -0,0 +1,109 @@
+import hashlib
+import time
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+import streamlit as st
+
+from arrow_fetch import BatchedResult, arrow_to_pandas, format_fetch_stats
+from conn_config import config_dict as cfg
+from result_cache import RESULT_CACHE
+from result_store import ResultHandle
+
+
+ROW_CAP = cfg["result_row_cap"]
+LOAD_MORE_ROWS = cfg["result_load_more_rows"]
+POLL_SECONDS = cfg["result_poll_seconds"]
+PREVIEW_REFRESH_SECONDS = cfg["result_preview_refresh_seconds"]
+
+
+def _preview(batched: BatchedResult) -> None:
+    """Shows the row counter and the rows loaded so far of a download in progress."""
+    total = f" of {batched.total_rows:,}" if batched.total_rows is not None else ""
+    st.caption(f"Loading... {batched.rows:,}{total} rows")
+    st.dataframe(arrow_to_pandas(batched.table()))
+
+
+@st.fragment(run_every=PREVIEW_REFRESH_SECONDS)
+def _wait_for_rows(batched: BatchedResult) -> None:
+    """Refreshes the preview, rerunning the app once the download has stopped."""
+    if not batched.fetching:
+        st.rerun()
+    _preview(batched)
+
+
+def show_result(
+    pool: Any,
+    statement: str,
+    results: Optional[Dict[str, ResultHandle]],
+    render: Callable[[pd.DataFrame], None],
+    show_stats: bool = False,
+    on_rows: Optional[Callable[[], None]] = None,
+) -> None:
+    """Displays the result of a statement, streaming it in when it has to be fetched.
+
+    Stored and cached results are rendered straight away. Otherwise the
+    script waits only for the first batch of rows; the rest download in the
+    background while a fragment refreshes a preview with a live row counter,
+    and the app reruns to draw the full view with render() once downloading
+    stops. Downloading stops at the row cap and a "Load more" button resumes
+    it. Complete and capped results are both stored in results, so the
+    conversation replays them. on_rows() is called once, when the first rows
+    are about to be drawn.
+    """
+    # In-flight and capped downloads survive reruns so "Load more" can resume them
+    pending: Dict[str, BatchedResult] = st.session_state.setdefault("batched_results", {})
+    batched = pending.get(statement)
+    if batched is None:
+        handle = results.get(statement) if results is not None else None
+        if handle is None:
+            handle = RESULT_CACHE.get(statement)
+            if handle is not None and results is not None:
+                results[statement] = handle
+        if handle is not None:
+            if show_stats and handle.fetch_stats:
+                st.caption(f"Query ID: {handle.query_id} · {format_fetch_stats(handle.fetch_stats)}")
+            if on_rows is not None:
+                on_rows()
+            render(handle.to_pandas())
+            return
+
+        with st.spinner("Running generated SQL Query..."):
+            batched = BatchedResult(pool, statement, ROW_CAP)
+        pending[statement] = batched
+
+    while batched.fetching and not batched.rows:
+        time.sleep(POLL_SECONDS)
+    if on_rows is not None:
+        on_rows()
+    if batched.fetching:
+        _wait_for_rows(batched)
+        return
+
+    if batched.error is not None:
+        pending.pop(statement, None)
+        raise batched.error
+
+    table = batched.table()
+    handle = results.get(statement) if results is not None else None
+    if handle is None or handle.num_rows != table.num_rows:
+        handle = ResultHandle(statement, table, query_id=batched.query_id, fetch_stats=batched.stats())
+        if results is not None:
+            results[statement] = handle
+    total = f" of {batched.total_rows:,}" if batched.total_rows is not None else ""
+    if batched.complete:
+        pending.pop(statement, None)
+        RESULT_CACHE.put(statement, handle)
+        if show_stats:
+            st.caption(f"Query ID: {handle.query_id} · {format_fetch_stats(handle.fetch_stats)}")
+    else:
+        st.caption(f"Showing the first {batched.rows:,}{total} rows.")
+        key = hashlib.md5(statement.encode("utf-8")).hexdigest()
+        st.button(
+            "Load more",
+            key=f"load_more_{id(results)}_{key}",
+            on_click=batched.load_more,
+            args=(LOAD_MORE_ROWS,),
+        )
+
+    render(arrow_to_pandas(table))
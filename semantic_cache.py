@@ -0,0 +1,183 @@
+import hashlib
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import numpy as np
+
+from conn_config import config_dict as cfg
+from conversation_history import exchanges
+from semantic_model import semantic_model_version
+from sql_templates import canonical_words, normalize_question, sample_values, synonyms
+from verified_queries import literals
+
+
+SIMILARITY_THRESHOLD = cfg["semantic_cache_threshold"]
+MAX_ENTRIES = cfg["semantic_cache_max_entries"]
+# sentence-transformers model name; None uses the hashing vectorizer
+EMBEDDING_MODEL = cfg["semantic_cache_model"]
+HASH_DIMENSIONS = 2 ** 12
+
+def hashing_embedding(words: List[str], dimensions: int = HASH_DIMENSIONS) -> np.ndarray:
+    """Embeds words as a normalized hashed bag of words and character trigrams.
+
+    Word order is ignored, so "sales by region each month" and "monthly
+    sales per region" embed alike; the trigrams make typos count as close.
+    """
+    features = list(words)
+    features += [f"#{word[i:i + 3]}" for word in words for i in range(max(len(word) - 2, 1))]
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for feature in features:
+        digest = hashlib.md5(feature.encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], "little") % dimensions
+        # Whole words weigh more than their trigrams
+        weight = 0.1 if feature.startswith("#") else 1.0
+        vector[index] += weight if digest[4] & 1 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _embedder(model_name: Optional[str]) -> Optional[Callable[[str], np.ndarray]]:
+    if not model_name:
+        return None
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        return None
+    model = SentenceTransformer(model_name)
+    return lambda text: model.encode(text, normalize_embeddings=True).astype(np.float32)
+
+
+def conversation_context(history: List[Dict[str, Any]]) -> str:
+    """Returns the key of the turn a follow-up question builds on, "" for a first question.
+
+    That is the SQL of the previous answer, so paraphrases of the previous
+    question answered the same way share follow-ups, else the previous
+    question itself.
+    """
+    pairs = exchanges(history)
+    if not pairs:
+        return ""
+    question, answer = pairs[-1]
+    statements = [item["statement"] for item in answer.get("content", []) if item.get("type") == "sql"]
+    if statements:
+        return " ".join(" ".join(statement.split()) for statement in statements)
+    return normalize_question(" ".join(item.get("text", "") for item in question.get("content", [])))
+
+
+class SemanticCache:
+    """Maps paraphrased questions to the Analyst answer of an earlier question.
+
+    Questions are embedded with a local sentence-transformers model when one
+    is configured and installed, else with a hashing vectorizer over
+    canonicalized words (measure synonyms mapped to the measure name), so it
+    works offline. Embeddings are kept in a matrix and searched by cosine
+    similarity. A hit needs the similarity threshold, the same literals
+    (years, months, dimension values) as the stored question and the same
+    conversation context (see conversation_context), so follow-ups only
+    reuse answers to the same follow-up of the same turn. All entries are
+    dropped when the semantic model file changes.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SIMILARITY_THRESHOLD,
+        max_entries: int = MAX_ENTRIES,
+        model_name: Optional[str] = EMBEDDING_MODEL,
+    ) -> None:
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._embed_model = _embedder(model_name)
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._entries: List[Dict[str, Any]] = []
+        self._synonyms: Dict[str, str] = {}
+        self._values: Set[str] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self) -> None:
+        version = semantic_model_version()
+        if version != self._version:
+            self._vectors = np.zeros((0, 0), dtype=np.float32)
+            self._entries = []
+            self._synonyms = synonyms()
+            self._values = {word for known in sample_values().values() for key in known for word in key.split()}
+            self._version = version
+
+    def _embed(self, question: str) -> np.ndarray:
+        if self._embed_model is not None:
+            return self._embed_model(question)
+        return hashing_embedding(canonical_words(question, self._synonyms))
+
+    def lookup(self, question: str, context: str = "") -> Optional[Dict[str, Any]]:
+        """Returns the stored answer of the most similar earlier question, or None.
+
+        The result holds the earlier question, its content items, the request
+        id of the Analyst call that produced it, the similarity and
+        lookup_seconds.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            self._check_version()
+            if not self._entries:
+                self.misses += 1
+                return None
+            similarities = self._vectors @ self._embed(question)
+            question_literals = literals(normalize_question(question), self._values)
+            for index in np.argsort(similarities)[::-1]:
+                if similarities[index] < self.threshold:
+                    break
+                entry = self._entries[index]
+                if entry["literals"] == question_literals and entry["context"] == context:
+                    self.hits += 1
+                    return {
+                        **entry,
+                        "similarity": float(similarities[index]),
+                        "lookup_seconds": time.perf_counter() - start,
+                    }
+            self.misses += 1
+            return None
+
+    def add(
+        self, question: str, content: List[Dict[str, Any]], request_id: Optional[str] = None, context: str = ""
+    ) -> None:
+        """Stores an Analyst answer; answers without SQL are not worth reusing."""
+        if not any(item.get("type") == "sql" for item in content):
+            return
+        with self._lock:
+            self._check_version()
+            vector = self._embed(question)
+            if len(self._entries) >= self.max_entries:
+                # Oldest entry first
+                self._entries.pop(0)
+                self._vectors = self._vectors[1:]
+            self._vectors = vector[None, :] if not self._entries else np.vstack([self._vectors, vector])
+            self._entries.append(
+                {
+                    "question": question,
+                    "content": content,
+                    "request_id": request_id,
+                    "literals": literals(normalize_question(question), self._values),
+                    "context": context,
+                }
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+def cached_response(hit: Dict[str, Any]) -> Dict[str, Any]:
+    """Builds an Analyst-shaped response for a semantic cache hit, like render_stream returns."""
+    return {
+        "message": {"role": "analyst", "content": hit["content"]},
+        "request_id": hit["request_id"],
+        "timings": {"ttft_seconds": hit["lookup_seconds"], "ttfr_seconds": hit["lookup_seconds"]},
+        "cached_question": hit["question"],
+    }
+
+
+# Shared by every session served from this process
+SEMANTIC_CACHE = SemanticCache()
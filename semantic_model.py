@@ -0,0 +1,112 @@
+import hashlib
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from conn_config import config_dict as cfg
+
+
+# Local copy of the semantic model that is uploaded to the stage
+SEMANTIC_MODEL_PATH = cfg["file"]
+
+_version_cache: Optional[Tuple[float, str]] = None
+
+
+def semantic_model_version(path: str = SEMANTIC_MODEL_PATH) -> str:
+    """Returns a short content hash identifying the current semantic model."""
+    global _version_cache
+
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        # No local copy, fall back to the staged file name
+        return path
+
+    if _version_cache is None or _version_cache[0] != mtime:
+        with open(path, "rb") as model_file:
+            digest = hashlib.sha256(model_file.read()).hexdigest()[:16]
+        _version_cache = (mtime, digest)
+
+    return _version_cache[1]
+
+
+_model_cache: Optional[Tuple[str, Dict[str, Any]]] = None
+
+
+def load_semantic_model(path: str = SEMANTIC_MODEL_PATH) -> Dict[str, Any]:
+    """Loads the local semantic model YAML, reloading it when the file changes."""
+    global _model_cache
+
+    version = semantic_model_version(path)
+    if _model_cache is None or _model_cache[0] != version:
+        with open(path, "r") as model_file:
+            _model_cache = (version, yaml.safe_load(model_file))
+    return _model_cache[1]
+
+
+def time_dimensions(path: str = SEMANTIC_MODEL_PATH) -> List[str]:
+    """Returns the names of all time dimensions in the semantic model."""
+    return [
+        dimension["name"]
+        for table in load_semantic_model(path).get("tables", [])
+        for dimension in table.get("time_dimensions", [])
+    ]
+
+
+def measure_aggregations(path: str = SEMANTIC_MODEL_PATH) -> Dict[str, str]:
+    """Maps measure names to their default aggregation (sum when not given)."""
+    return {
+        measure["name"]: measure.get("default_aggregation", "sum")
+        for table in load_semantic_model(path).get("tables", [])
+        for measure in table.get("measures", [])
+    }
+
+
+def additive_columns(path: str = SEMANTIC_MODEL_PATH) -> List[str]:
+    """Returns the names, and plain column expressions, of the measures that add up (sum aggregation)."""
+    columns = []
+    for table in load_semantic_model(path).get("tables", []):
+        for measure in table.get("measures", []):
+            if measure.get("default_aggregation", "sum") == "sum":
+                columns.append(measure["name"])
+                if re.fullmatch(r"\w+", str(measure.get("expr", ""))):
+                    columns.append(measure["expr"])
+    return columns
+
+
+def verified_queries(path: str = SEMANTIC_MODEL_PATH) -> List[Dict[str, Any]]:
+    """Returns the verified queries (name, question, sql, ...) of the semantic model."""
+    return list(load_semantic_model(path).get("verified_queries") or [])
+
+
+def logical_table_sql(table: Dict[str, Any]) -> str:
+    """Returns a SELECT exposing a logical table's columns under their semantic model names."""
+    base = table["base_table"]
+    columns = [
+        f"{column['expr']} AS {column['name']}"
+        for kind in ("time_dimensions", "dimensions", "measures")
+        for column in table.get(kind, [])
+    ]
+    return f"SELECT {', '.join(columns)} FROM {base['database']}.{base['schema']}.{base['table']}"
+
+
+def physical_sql(statement: str, path: str = SEMANTIC_MODEL_PATH) -> str:
+    """Makes SQL written against the semantic model's logical tables runnable on the base tables.
+
+    Verified queries refer to logical table and column names (daily_revenue,
+    daily_cogs); every logical table the statement mentions is defined as a
+    CTE of the same name over its base table.
+    """
+    statement = statement.strip().rstrip(";").strip()
+    ctes = [
+        f"{table['name']} AS ({logical_table_sql(table)})"
+        for table in load_semantic_model(path).get("tables", [])
+        if "base_table" in table and re.search(rf"\b{re.escape(table['name'])}\b", statement, re.IGNORECASE)
+    ]
+    if not ctes:
+        return statement
+    if re.match(r"WITH\b", statement, re.IGNORECASE):
+        return f"WITH {', '.join(ctes)},\n{statement[4:].lstrip()}"
+    return f"WITH {', '.join(ctes)}\n{statement}"
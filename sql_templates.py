@@ -0,0 +1,212 @@
+import calendar
+import re
+from datetime import date
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from semantic_model import load_semantic_model, verified_queries
+
+
+MONTHS = {
+    name: index % 12 + 1
+    for index, name in enumerate(
+        "january february march april may june july august september october november december "
+        "jan feb mar apr may jun jul aug sep oct nov dec".split()
+    )
+}
+_YEAR = re.compile(r"^(19|20)\d{2}$")
+_DATE_RANGE = re.compile(r"BETWEEN\s+'(\d{4}-\d{2}-\d{2})'\s+AND\s+'(\d{4}-\d{2}-\d{2})'", re.IGNORECASE)
+_STRING = re.compile(r"'((?:[^']|'')*)'")
+# Words that do not change what is being asked
+_STOPWORDS = set(
+    "a an the of for in on by per each every what was were is are show me give list get how much many "
+    "and with to from all our total".split()
+)
+_STEMS = {"monthly": "month", "months": "month", "daily": "day", "days": "day", "weekly": "week",
+          "weeks": "week", "yearly": "year", "annual": "year", "years": "year", "regions": "region",
+          "products": "product", "lines": "line"}
+# Time grains a question can ask for, after stemming
+GRAINS = {"day", "week", "month", "year"}
+
+
+def normalize_question(question: str) -> str:
+    """Lowercases a question and drops punctuation and repeated whitespace."""
+    return " ".join(re.sub(r"[^\w\s]", " ", question.lower()).split())
+
+
+def sample_values(model: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, str]]:
+    """Maps each dimension with sample values to {normalized value: value as written in the model}."""
+    model = model or load_semantic_model()
+    values: Dict[str, Dict[str, str]] = {}
+    for table in model.get("tables", []):
+        for dimension in table.get("dimensions", []):
+            for value in dimension.get("sample_values", []):
+                values.setdefault(dimension["name"], {})[normalize_question(str(value))] = str(value)
+    return values
+
+
+def synonyms(model: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    """Maps measure synonyms and base column names to the measure name, e.g. sales -> daily_revenue."""
+    model = model or load_semantic_model()
+    mapping: Dict[str, str] = {}
+    for table in model.get("tables", []):
+        for measure in table.get("measures", []):
+            for phrase in [measure.get("expr", "")] + list(measure.get("synonyms", [])) + [measure["name"]]:
+                phrase = normalize_question(str(phrase))
+                if phrase and " " not in phrase and phrase not in mapping:
+                    mapping[phrase] = measure["name"]
+    return mapping
+
+
+def canonical_words(question: str, mapping: Dict[str, str]) -> List[str]:
+    """Returns the words that carry a question's meaning, with synonyms replaced by the measure name."""
+    words = []
+    for word in normalize_question(question).split():
+        word = _STEMS.get(word, word)
+        if word in _STOPWORDS:
+            continue
+        if word not in mapping and word.endswith("s") and word[:-1] in mapping:
+            word = word[:-1]
+        words.append(mapping.get(word, word))
+    return words
+
+
+def meaning_words(question: str, mapping: Dict[str, str]) -> Set[str]:
+    """Returns the measures and time grains a question names, e.g. {"daily_revenue", "grain:day"}."""
+    measures = set(mapping.values())
+    found = set()
+    for word in canonical_words(question, mapping):
+        if word in measures:
+            found.add(word)
+        elif word in GRAINS:
+            found.add(f"grain:{word}")
+    return found
+
+
+def extract_slots(question: str, values: Dict[str, Dict[str, str]]) -> Tuple[Dict[str, Any], str]:
+    """Extracts typed slot values from a normalized question.
+
+    Returns the slots found (a date_range from a year and optional month,
+    and one value per dimension, validated against its sample values) and
+    the question with those words removed. Questions naming several years,
+    months or values of one dimension, or a number that is not a year,
+    yield an "ambiguous" slot.
+    """
+    slots: Dict[str, Any] = {}
+    words = question.split()
+    remaining = list(words)
+
+    for dimension, known in values.items():
+        found = [value for key, value in known.items() if re.search(rf"\b{re.escape(key)}\b", question)]
+        if len(found) > 1:
+            slots["ambiguous"] = dimension
+        elif found:
+            slots[dimension] = found[0]
+            for word in normalize_question(found[0]).split():
+                if word in remaining:
+                    remaining.remove(word)
+
+    years = [word for word in words if _YEAR.match(word)]
+    months = [MONTHS[word] for word in words if word in MONTHS]
+    if len(set(years)) > 1 or len(set(months)) > 1 or (months and not years):
+        slots["ambiguous"] = "date_range"
+    elif years:
+        year = int(years[0])
+        if months:
+            month = months[0]
+            slots["date_range"] = (date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1]))
+        else:
+            slots["date_range"] = (date(year, 1, 1), date(year, 12, 31))
+    remaining = [word for word in remaining if not _YEAR.match(word) and word not in MONTHS]
+    if any(word.isdigit() for word in remaining):
+        # A day, count or other number no slot can hold would be silently dropped
+        slots["ambiguous"] = "number"
+    return slots, " ".join(remaining)
+
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+class SqlTemplate:
+    """A verified query with its literals replaced by typed slots.
+
+    Date ranges written as BETWEEN 'yyyy-mm-dd' AND 'yyyy-mm-dd' become a
+    date_range slot and string literals that are sample values of a
+    dimension become a slot named after that dimension.
+    """
+
+    def __init__(self, query: Dict[str, Any], values: Dict[str, Dict[str, str]]) -> None:
+        self.name = query.get("name", query["question"])
+        self.question = query["question"]
+        sql = query["sql"]
+        self.slots: List[str] = []
+
+        if len(_DATE_RANGE.findall(sql)) == 1:
+            sql = _DATE_RANGE.sub("BETWEEN {date_start} AND {date_end}", sql.replace("{", "{{").replace("}", "}}"))
+            self.slots.append("date_range")
+        else:
+            sql = sql.replace("{", "{{").replace("}", "}}")
+
+        def to_slot(literal: re.Match) -> str:
+            text = literal.group(1).replace("''", "'")
+            for dimension, known in values.items():
+                if normalize_question(text) in known and dimension not in self.slots:
+                    self.slots.append(dimension)
+                    return "{" + dimension + "}"
+            return literal.group(0)
+
+        self.sql = _STRING.sub(to_slot, sql)
+        _, self.skeleton = extract_slots(normalize_question(self.question), values)
+
+    def render(self, slots: Dict[str, Any]) -> str:
+        """Returns the template's SQL with the slot values filled in as SQL literals."""
+        params: Dict[str, str] = {}
+        if "date_range" in self.slots:
+            start, end = slots["date_range"]
+            params.update(date_start=_literal(start.isoformat()), date_end=_literal(end.isoformat()))
+        for slot in self.slots:
+            if slot != "date_range":
+                params[slot] = _literal(slots[slot])
+        return self.sql.format(**params)
+
+
+class TemplateIndex:
+    """Resolves questions against SQL templates mined from the verified queries."""
+
+    def __init__(self, model: Optional[Dict[str, Any]] = None) -> None:
+        model = model or load_semantic_model()
+        self.values = sample_values(model)
+        self.synonyms = synonyms(model)
+        self.templates = [
+            template
+            for template in (
+                SqlTemplate(query, self.values)
+                for query in verified_queries()
+                if query.get("question") and query.get("sql")
+            )
+            if template.slots
+        ]
+
+    def match(self, question: str, threshold: float) -> Optional[Dict[str, Any]]:
+        """Returns the best template whose wording matches and whose slots the question fills.
+
+        The result holds the template name, rendered sql (still on logical
+        tables), score and the slot values.
+        """
+        slots, skeleton = extract_slots(normalize_question(question), self.values)
+        if "ambiguous" in slots:
+            return None
+        meaning = meaning_words(skeleton, self.synonyms)
+        best = None
+        for template in self.templates:
+            # Every slot must be filled and the question may not name values the template has no slot for
+            if set(template.slots) != set(slots):
+                continue
+            # Nor a different measure or time grain than the template's
+            if meaning_words(template.skeleton, self.synonyms) != meaning:
+                continue
+            score = SequenceMatcher(None, skeleton, template.skeleton).ratio()
+            if score >= threshold and (best is None or score > best["score"]):
+                best = {"name": template.name, "sql": template.render(slots), "score": score, "slots": slots}
+        return best
@@ -0,0 +1,92 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from conn_config import config_dict as cfg
+
+
+MAX_WORKERS = cfg["llm_max_workers"]
+TIMEOUT_SECONDS = cfg["llm_timeout_seconds"]
+
+
+def _timed(func: Callable[[], Any]) -> Callable[[], Dict[str, Any]]:
+    def run() -> Dict[str, Any]:
+        start = time.perf_counter()
+        result = func()
+        return {"result": result, "seconds": time.perf_counter() - start}
+
+    return run
+
+
+def run_concurrently(
+    tasks: Dict[str, Callable[[], Any]],
+    max_workers: int = MAX_WORKERS,
+    timeout: float = TIMEOUT_SECONDS,
+    timeouts: Optional[Dict[str, float]] = None,
+) -> Tuple[Dict[str, Dict[str, Any]], float]:
+    """Runs independent calls on a bounded thread pool and collects whatever finishes.
+
+    Each task gets its own timeout (timeouts[name], else timeout), counted from
+    when it was submitted. A task that fails or times out does not affect the
+    others; its outcome records the error instead of a result. Timed out calls
+    cannot be interrupted, so they are abandoned and finish in the background.
+
+    Args:
+        tasks (Dict[str, Callable[[], Any]]): Calls to run, by name.
+        max_workers (int): Maximum number of calls in flight.
+        timeout (float): Default timeout per task in seconds.
+        timeouts (Dict[str, float], optional): Timeouts for individual tasks.
+
+    Returns:
+        Tuple[Dict[str, Dict[str, Any]], float]: Per task, in the order given,
+        its status ("ok", "error" or "timeout"), result, error and the call's
+        own duration in seconds; and the wall time of the whole run.
+    """
+    timeouts = timeouts or {}
+    start = time.perf_counter()
+    outcomes: Dict[str, Dict[str, Any]] = {
+        name: {"status": "timeout", "result": None, "error": None, "seconds": None} for name in tasks
+    }
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+    futures: Dict[Future, str] = {executor.submit(_timed(func)): name for name, func in tasks.items()}
+    deadlines = {name: start + timeouts.get(name, timeout) for name in tasks}
+    pending = set(futures)
+    try:
+        while pending:
+            next_deadline = min(deadlines[futures[future]] for future in pending)
+            done, pending = wait(
+                pending, timeout=max(next_deadline - time.perf_counter(), 0), return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                outcome = outcomes[futures[future]]
+                try:
+                    outcome.update(future.result(), status="ok")
+                except Exception as e:
+                    outcome.update(status="error", error=e)
+            now = time.perf_counter()
+            for future in [future for future in pending if deadlines[futures[future]] <= now]:
+                pending.discard(future)
+                future.cancel()
+                outcomes[futures[future]]["error"] = TimeoutError(
+                    f"{futures[future]} did not finish within {timeouts.get(futures[future], timeout)} s"
+                )
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return outcomes, time.perf_counter() - start
+
+
+def format_report(outcomes: Dict[str, Dict[str, Any]], wall: float) -> str:
+    """Summarizes a run: per-task status and duration, wall time against the summed call times."""
+    lines = []
+    summed = 0.0
+    for name, outcome in outcomes.items():
+        if outcome["seconds"] is not None:
+            summed += outcome["seconds"]
+            lines.append(f"{name:<16} {outcome['status']:<8} {outcome['seconds']:>7.2f} s")
+        else:
+            lines.append(f"{name:<16} {outcome['status']:<8} {'-':>7}   {outcome['error']}")
+    speedup = f" ({summed / wall:.1f}x)" if wall else ""
+    lines.append(f"Wall time {wall:.2f} s vs {summed:.2f} s summed over completed calls{speedup}")
+    return "\n".join(lines)
@@ -0,0 +1,67 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+from local_replica import LocalReplica
+
+
+@pytest.fixture
+def replica(tmp_path):
+    replica = LocalReplica(pool=None, replica_dir=str(tmp_path))
+    replica.refreshed_at = datetime.now(timezone.utc)
+    replica.window_start = {"daily_revenue": date(2024, 12, 1)}
+    return replica
+
+
+def routes_locally(replica, where):
+    local, _ = replica.can_run(f"SELECT date, SUM(revenue) FROM daily_revenue WHERE {where} GROUP BY date")
+    return local
+
+
+@pytest.mark.parametrize("where", [
+    "date >= '2024-12-01'",
+    "date > '2024-12-05' AND date < '2024-12-15'",
+    "date BETWEEN '2024-12-02' AND '2024-12-31'",
+    "'2024-12-10' <= date AND revenue IS NOT NULL",
+    "dr.date >= DATE '2024-12-10'",
+])
+def test_lower_bound_in_window_runs_locally(replica, where):
+    assert routes_locally(replica, where)
+
+
+@pytest.mark.parametrize("where", [
+    "date < '2024-12-15'",
+    "date <> '2024-12-20'",
+    "date > '2024-12-05' OR EXTRACT(YEAR FROM date) = 2023",
+    "date >= '2024-11-01'",
+    "NOT date < '2024-12-05'",
+    "date NOT BETWEEN '2024-12-02' AND '2024-12-31'",
+    "EXTRACT(YEAR FROM date) = 2024",
+])
+def test_unbounded_or_widened_filter_goes_to_snowflake(replica, where):
+    assert not routes_locally(replica, where)
+
+
+@pytest.mark.parametrize("statement", [
+    "WITH running AS (SELECT date, SUM(cogs) OVER (ORDER BY date) AS cumulative_cogs FROM daily_revenue) "
+    "SELECT * FROM running WHERE date >= '2024-12-10'",
+    "SELECT date, revenue FROM daily_revenue QUALIFY date >= '2024-12-10'",
+    "SELECT date, LAG(revenue, 365) OVER (ORDER BY date) AS last_year FROM daily_revenue "
+    "QUALIFY date >= '2024-12-10'",
+    "SELECT * FROM (SELECT product_id, MAX(date) AS date FROM daily_revenue GROUP BY product_id) "
+    "WHERE date >= '2024-12-10'",
+    "SELECT SUM(CASE WHEN date >= '2024-12-10' THEN revenue END) FROM daily_revenue",
+])
+def test_bound_outside_the_table_scan_goes_to_snowflake(replica, statement):
+    assert not replica.can_run(statement)[0]
+
+
+def test_join_with_bound_in_where_runs_locally(replica):
+    assert replica.can_run(
+        "SELECT p.product_line, SUM(dr.revenue) FROM daily_revenue AS dr JOIN product_dim AS p "
+        "ON dr.product_id = p.product_id WHERE dr.date >= '2024-12-10' GROUP BY p.product_line ORDER BY 2 DESC"
+    )[0]
+
+
+def test_dimension_tables_run_locally_without_dates(replica):
+    assert replica.can_run("SELECT * FROM product_dim")[0]
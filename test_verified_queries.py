@@ -0,0 +1,47 @@
+import pytest
+
+from verified_queries import VerifiedQueryMatcher, match_score
+
+
+LOWEST = "For each month, what was the lowest daily revenue and on what date did that lowest revenue occur?"
+CUMULATIVE = "daily cumulative expenses in 2023 dec"
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return VerifiedQueryMatcher(expected_seconds=lambda: 0.0)
+
+
+@pytest.mark.parametrize("question, name", [
+    (LOWEST, "lowest revenue each month"),
+    (CUMULATIVE, CUMULATIVE),
+    ("Daily cumulative expenses in 2023 december", CUMULATIVE),
+    ("daily cummulative expenses in 2023 dec", CUMULATIVE),
+])
+def test_verified_questions_and_typos_match(matcher, question, name):
+    match = matcher.match(question)
+    assert match is not None and match["name"] == name
+
+
+@pytest.mark.parametrize("question", [
+    "For each month, what was the highest daily revenue and on what date did that highest revenue occur?",
+    "For each month, what was the max daily revenue and on what date did that max revenue occur?",
+    "daily cumulative sales in 2023 dec",
+    "daily cumulative revenue in 2023 dec",
+    "weekly cumulative expenses in 2023 dec",
+    "daily average expenses in 2023 dec",
+    "daily cumulative expenses in 2023 dec 15",
+])
+def test_near_misses_go_to_the_analyst(matcher, question):
+    assert matcher.match(question) is None
+
+
+def test_template_fills_a_new_date_range(matcher):
+    match = matcher.match("daily cumulative expenses in 2024 jan")
+    assert match["name"] == CUMULATIVE
+    assert "'2024-01-01'" in match["sql"] and "'2024-01-31'" in match["sql"]
+
+
+def test_differing_modifier_scores_zero():
+    assert match_score("top products by revenue", "bottom products by revenue") == 0.0
+    assert match_score("products not in the east", "products in the east") == 0.0
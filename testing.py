@@ -1,7 +1,5 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 import pandas as pd
-import requests
-import snowflake.connector
 import streamlit as st
 from datetime import datetime
 import base64
@@ -9,10 +7,28 @@ import base64
 import os
 from dotenv import load_dotenv
 
+from admin_panel import show_admin_panel
+from analyst_client import ANALYST_CLIENT
+from analyst_stream import render_stream
+from chart_planner import chart_frame
+from connection_pool import POOL
 from conn_config import config_dict as cfg
+from conversation_history import build_messages
+from dataset_digest import insight_prompt
+from downsample import downsample_frame
+from insight_cache import INSIGHT_CACHE, insight_key
+from insight_view import INSIGHT_AUTOSTART, show_insight, start_insight
+from llm_cache import LLM_CACHE
+from local_replica import ROUTER
+from result_cache import RESULT_CACHE
+from result_store import get_result
+from result_view import show_result
+from semantic_cache import SEMANTIC_CACHE, cached_response, conversation_context
+from tracing import TRACER
+from verified_queries import VERIFIED_QUERIES, verified_response
 
 # from snowflake.cortex import Complete
-import openai
+from chat_client import CHAT_CLIENT
 
 
 
@@ -26,6 +42,7 @@ FILE = cfg["file"]
 PORT = cfg["port"]
 WAREHOUSE = cfg["warehouse"]
 ROLE = cfg["role"]
+INSIGHT_MODEL = cfg["insight_model"]
 
 APP_ICON_PATH = cfg["app_icon"]
 USER_ICON_PATH = cfg["user_icon"]
@@ -39,23 +56,10 @@ load_dotenv()
 OPENAI_KEY = os.environ["OpenAI_api_key"]
 
 
-# Connecting to Snowflake
-if 'CONN' not in st.session_state or st.session_state.CONN is None:
-    st.session_state.CONN = snowflake.connector.connect(
-        user=os.environ["SNOWFLAKE_USER"],
-        password=os.environ["SNOWFLAKE_PASSWORD"],
-        account=os.environ["SNOWFLAKE_ACCOUNT"],
-        
-        host=HOST,
-        port=PORT,
-        warehouse=WAREHOUSE,
-        role=ROLE,
-    )
-
-
-
 # Convert image to Base64 for the app icon
+@TRACER.span("encode_image")
 def image_to_base64(image_path: str) -> str:
+    TRACER.annotate(path=image_path)
     with open(image_path, "rb") as img_file:
         return base64.b64encode(img_file.read()).decode("utf-8")
 
@@ -95,27 +99,7 @@ st.markdown(
 
 
 # Functions for message processing
-def send_message(prompt: str) -> Dict[str, Any]:
-    request_body = {
-        "messages": [{"role": "user", "content": [{"type": "text", "text": prompt}]}],
-        "semantic_model_file": f"@{DATABASE}.{SCHEMA}.{STAGE}/{FILE}",
-    }
-    resp = requests.post(
-        url=f"https://{HOST}/api/v2/cortex/analyst/message",
-        json=request_body,
-        headers={
-            "Authorization": f'Snowflake Token="{st.session_state.CONN.rest.token}"',
-            "Content-Type": "application/json",
-        },
-    )
-    request_id = resp.headers.get("X-Snowflake-Request-Id")
-    if resp.status_code < 400:
-        return {**resp.json(), "request_id": request_id}  # type: ignore[arg-type]
-    else:
-        raise Exception(
-            f"Failed request (id: {request_id}) with status {resp.status_code}: {resp.text}"
-        )
-
+@TRACER.span("process_message")
 def process_message(prompt: str) -> None:
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     st.session_state.messages.append(
@@ -123,16 +107,44 @@ def process_message(prompt: str) -> None:
     )
     with st.chat_message("user", avatar=USER_ICON_PATH):
         st.markdown(f"{prompt}")
+    results: Dict[str, Any] = {}
     with st.chat_message("assistant", avatar=BOT_ICON_PATH):
-        with st.spinner("The assistant is working on your question..."):
-            response = send_message(prompt=prompt)
-            request_id = response["request_id"]
-            content = response["message"]["content"]
-            display_content(content=content, request_id=request_id, user_question=prompt)
+        match = VERIFIED_QUERIES.match(prompt)
+        # Follow-ups depend on the conversation, so answers are shared only after the same previous turn
+        context = conversation_context(st.session_state.messages[:-1])
+        hit = SEMANTIC_CACHE.lookup(prompt, context) if match is None else None
+        if match is not None:
+            # Verified questions are answered locally, without the Analyst round trip
+            response = verified_response(match)
+            st.caption(
+                f"Verified query \"{match['name']}\" (match {match['score']:.0%}), "
+                f"about {match['saved_seconds']:.1f} s faster than asking the Analyst"
+            )
+            display_content(content=response["message"]["content"], user_question=prompt, results=results)
+        elif hit is not None:
+            # A paraphrase of an earlier question reuses that answer
+            response = cached_response(hit)
+            st.caption(
+                f"Same question as \"{hit['question']}\" (similarity {hit['similarity']:.0%}), "
+                "answered from the semantic cache"
+            )
+            display_content(content=response["message"]["content"], user_question=prompt, results=results)
+        else:
+            response = render_stream(
+                # Earlier questions and answers give follow-ups their context
+                ANALYST_CLIENT.stream_message(messages=build_messages(st.session_state.messages[:-1], prompt)),
+                lambda item, on_rows: display_content(content=[item], user_question=prompt, results=results, on_rows=on_rows),
+            )
+            SEMANTIC_CACHE.add(prompt, response["message"]["content"], response["request_id"], context)
+        request_id = response["request_id"]
+        content = response["message"]["content"]
     st.session_state.messages.append(
-        {"role": "assistant", "content": content, "request_id": request_id, "timestamp": timestamp}
+        {"role": "assistant", "content": content, "request_id": request_id, "timestamp": timestamp,
+         "timings": response["timings"], "question": prompt, "results": results}
+    )
+    st.session_state.chat_history.append(
+        {"question": prompt, "response": content, "timestamp": timestamp, "results": results}
     )
-    st.session_state.chat_history.append({"question": prompt, "response": content, "timestamp": timestamp})
 
 # def display_content(
 #     content: List[Dict[str, str]],
@@ -150,6 +162,8 @@ def display_content(
     user_question: str,
     request_id: Optional[str] = None,
     message_index: Optional[int] = None, 
+    results: Optional[Dict[str, Any]] = None,
+    on_rows: Optional[Callable[[], None]] = None,
 ) -> None:
     
     """Displays a content item for a message."""
@@ -176,35 +190,52 @@ def display_content(
             #     st.code(item["statement"], language="sql")
             
             with st.expander("Query Results", expanded=True):
-                with st.spinner("Running generated SQL Query..."):
-                    df = pd.read_sql(item["statement"], st.session_state.CONN)
-                    
-                    if len(df.index) > 1:
-                        data_tab, line_tab, bar_tab, area_chart_tab, insight = st.tabs(
-                            ["Data", "Line Chart", "Bar Chart", "Area Chart", "insight"]
-                        )
-                        data_tab.dataframe(df)
-                        if len(df.columns) > 1:
-                            df = df.set_index(df.columns[0])
-                        
-                        with line_tab:
-                            st.line_chart(df)
-                        
-                        with bar_tab:
-                            st.bar_chart(df)
+                show_result(ROUTER, item["statement"], results, lambda df: display_result(df, item["statement"], user_question, f"{id(results)}_{hash(item['statement'])}"), on_rows=on_rows)
+
+
+def display_result(df: pd.DataFrame, statement: str, user_question: str, key: str) -> None:
+    """Displays a query result as a table, charts and an insight generated in the background."""
+    if len(df.index) > 1:
+        insight_df = df.set_index(df.columns[0]) if len(df.columns) > 1 else df
+        generate = lambda on_token: generate_insights(insight_df, user_question, on_token)
+        # Hashes the result once per render, not on every insight lookup
+        insight_id = insight_key(insight_df, user_question, INSIGHT_MODEL)
+        if INSIGHT_AUTOSTART:
+            # Runs while the charts below are rendered
+            start_insight(insight_id, generate)
+
+        with TRACER.span("render_chart", rows=len(df.index)):
+            chart_df, grain = chart_frame(ROUTER, statement, df)
+            if grain:
+                st.caption(
+                    f"Charts show {len(chart_df.index):,} points aggregated by {grain} "
+                    f"from {len(df.index):,} rows."
+                )
+            data_tab, line_tab, bar_tab, area_chart_tab, insight = st.tabs(
+                ["Data", "Line Chart", "Bar Chart", "Area Chart", "insight"]
+            )
+            data_tab.dataframe(df)
+
+            with line_tab:
+                st.line_chart(downsample_frame(chart_df))
+
+            with bar_tab:
+                st.bar_chart(chart_df)
+
+            with area_chart_tab:
+                st.area_chart(downsample_frame(chart_df))
+
+        with insight:
+            show_insight(insight_id, generate, key)
 
-                        with area_chart_tab:
-                            st.area_chart(df)
-                        
-                        with insight:
-                            st.markdown(generate_insights(df, user_question))
-                    
-                    else:
-                        st.dataframe(df)
+    else:
+        st.dataframe(df)
 
 
+@TRACER.span("encode_image")
 def img_to_base64(image_path):
     """Convert image to base64."""
+    TRACER.annotate(path=image_path)
     try:
         with open(image_path, "rb") as img_file:
             return base64.b64encode(img_file.read()).decode()
@@ -213,27 +244,23 @@ def img_to_base64(image_path):
         return None
     
 
-def generate_insights(dataframe: pd.DataFrame, question: str) -> str:
+@TRACER.span("generate_insights")
+def generate_insights(
+    dataframe: pd.DataFrame, question: str, on_token: Optional[Callable[[str], None]] = None
+) -> str:
     """
     Generates insights from the dataset using Snowflake Cortex LLM (Llama3.1-405b).
     
     Args:
         dataframe (pd.DataFrame): The dataset queried from Snowflake.
         question (str): The user's question to guide the insights generation.
+        on_token (Callable[[str], None], optional): Receives each token as it is streamed.
     
     Returns:
         str: Insights generated by the LLM.
     """
-    # Convert DataFrame to JSON string for API compatibility
-    dataset_json = dataframe.to_json(orient="split")
-
-    # Construct the prompt
-    prompt = (
-        f"The user has asked the following question: '{question}'. "
-        "Below is the dataset retrieved to address the question. "
-        "Analyze the dataset, extract meaningful insights, and present a concise response:\n\n"
-        f"Dataset:\n{dataset_json}"
-    )
+    # Summarize the result instead of sending every row
+    prompt = insight_prompt(question, dataframe)
 
     # Snowflake Cortex API Endpoint
     # api_url = "https://<org-name>-<account-name>.snowflakecomputing.com/api/v2/cortex/llm/message"
@@ -251,16 +278,10 @@ def generate_insights(dataframe: pd.DataFrame, question: str) -> str:
         "semantic_model_file": f"@{DATABASE}.{SCHEMA}.{STAGE}/{FILE}"
     }
 
-    # API headers
-    headers = {
-        "Authorization": f'Snowflake Token="{st.session_state.CONN.rest.token}"',
-        "Content-Type": "application/json"
-    }
-
     # Make the API call
     # response = requests.post(api_url, json=payload, headers=headers)
 
-    return get_chatgpt_response(prompt)
+    return get_chatgpt_response(prompt, model=INSIGHT_MODEL, on_token=on_token)
 
 
 
@@ -276,36 +297,20 @@ def generate_insights(dataframe: pd.DataFrame, question: str) -> str:
     #         f"Failed to generate insights with status {response.status_code}: {response.text}"
     #     )
     
-def get_chatgpt_response(user_prompt, model="gpt-3.5-turbo"):
+def get_chatgpt_response(user_prompt, model="gpt-3.5-turbo", on_token=None):
     """
-    Gets a response from ChatGPT for a given user prompt.
+    Gets a streamed response from ChatGPT for a given user prompt.
     
     Parameters:
-        api_key (str): Your OpenAI API key.
         user_prompt (str): The input prompt for the ChatGPT model.
         model (str): The model to use (default is "gpt-3.5-turbo").
+        on_token (callable): Receives each token of the response as it arrives.
     
     Returns:
         str: The response from ChatGPT.
     """
-    # Set the OpenAI API key
-    openai.api_key = OPENAI_KEY
-    
-    try:
-        # Make the API call to OpenAI
-        response = openai.ChatCompletion.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant for supply chain analysis."},
-                {"role": "user", "content": user_prompt},
-            ]
-        )
-        
-        # Extract the content of the assistant's response
-        return response['choices'][0]['message']['content'].strip()
-    
-    except Exception as e:
-        return f"An error occurred: {e}"
+    # Errors are raised so that failed calls are not cached as insights
+    return CHAT_CLIENT.stream(user_prompt, model=model, on_token=on_token)
 
 
 def main():
@@ -335,6 +340,48 @@ def main():
         {cfg["app_description"]} 
         """
     )
+
+    # Result cache usage, shared by all sessions
+    cache_stats = RESULT_CACHE.stats()
+    st.sidebar.caption(
+        f"Result cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+        f"({cache_stats['entries']} results, {cache_stats['bytes'] / 1e6:.1f} MB)"
+    )
+    insight_stats = INSIGHT_CACHE.stats()
+    st.sidebar.caption(
+        f"Insight cache: {insight_stats['hits']} hits / {insight_stats['misses']} misses "
+        f"({insight_stats['entries']} insights)"
+    )
+    llm_stats = LLM_CACHE.stats()
+    st.sidebar.caption(
+        f"LLM response cache: {llm_stats['hits']} hits / {llm_stats['misses']} misses"
+        + (" (bypassed)" if llm_stats["bypass"] else " (refreshing)" if llm_stats["refresh"] else "")
+    )
+    chat_stats = CHAT_CLIENT.stats()
+    if chat_stats["calls"]:
+        st.sidebar.caption(
+            f"Insight LLM: first token p50 {chat_stats['p50_ttft_seconds']:.1f} s, "
+            f"total p50 {chat_stats['p50_seconds']:.1f} s over {chat_stats['calls']} calls"
+        )
+    verified_stats = VERIFIED_QUERIES.stats()
+    if verified_stats["hits"]:
+        st.sidebar.caption(
+            f"Verified queries: {verified_stats['hits']} answered locally, "
+            f"~{verified_stats['saved_seconds']:.0f} s of Analyst time saved"
+        )
+    semantic_stats = SEMANTIC_CACHE.stats()
+    if semantic_stats["hits"]:
+        st.sidebar.caption(
+            f"Semantic cache: {semantic_stats['hits']} paraphrases answered, "
+            f"{semantic_stats['entries']} questions stored"
+        )
+    pool_stats = POOL.stats()
+    st.sidebar.caption(
+        f"Connections: {pool_stats['in_use']} in use / {pool_stats['idle']} idle, "
+        f"{pool_stats['waiting']} waiting (avg wait {pool_stats['avg_wait_seconds'] * 1000:.0f} ms)"
+    )
+    show_admin_panel()
+
     st.sidebar.title("Chat History")
     for i, chat in enumerate(st.session_state.chat_history):
         truncated_question = chat['question'] if len(chat['question']) < 20 else chat['question'][:20]
@@ -366,7 +413,8 @@ def main():
                             
                             # with st.expander("Query Results", expanded=True):
                             with st.spinner("Running generated SQL Query..."):
-                                df = pd.read_sql(item["statement"], st.session_state.CONN)
+                                handle = get_result(ROUTER, item["statement"], chat.get("results"))
+                                df = handle.to_pandas()
                                 
                                 if len(df.index) > 1:
                                     data_tab, line_tab, bar_tab, area_chart_tab = st.tabs(
@@ -405,7 +453,11 @@ def main():
     # Display existing messages
     for message in st.session_state.messages:
         with st.chat_message(message["role"], avatar=USER_ICON_PATH if message['role'] == "user" else BOT_ICON_PATH):
-            display_content(content=message["content"])
+            display_content(
+                content=message["content"],
+                user_question=message.get("question", ""),
+                results=message.get("results"),
+            )
 
     # Chat input
     if user_input := st.chat_input("Ask me a question."):
@@ -13,7 +13,8 @@ from conn_config import config_dict as cfg
 
 from snowflake.cortex import Complete
 from snowflake.snowpark import Session
-import openai
+from chat_client import CHAT_CLIENT
+from llm_cache import LLM_CACHE
 
 
 # Constants:
@@ -94,50 +95,51 @@ snowflake_session = Session.builder.configs(connection_params).create()
 #             f"Failed to generate insights with status {response.status_code}: {response.text}"
 #         )
     
-def get_ai_response(prompt):
-     completion = Complete(
-        model="llama2-70b-chat",
-        prompt=prompt,
-        session=snowflake_session,
+def get_ai_response(prompt, model="llama2-70b-chat"):
+     return LLM_CACHE.cached_call(
+        model,
+        prompt,
+        lambda: Complete(
+            model=model,
+            prompt=prompt,
+            session=snowflake_session,
+        ),
     )
     
 # if user_input := st.chat_input("Ask me a question."):
 #         st.markdown(get_ai_response(prompt=user_input))
 
-def get_chatgpt_response(user_prompt, model="gpt-3.5-turbo"):
+def get_chatgpt_response(user_prompt, model="gpt-3.5-turbo", on_token=None):
     """
-    Gets a response from ChatGPT for a given user prompt.
+    Gets a streamed response from ChatGPT for a given user prompt.
     
     Parameters:
-        api_key (str): Your OpenAI API key.
         user_prompt (str): The input prompt for the ChatGPT model.
         model (str): The model to use (default is "gpt-3.5-turbo").
+        on_token (callable): Receives each token of the response as it arrives.
     
     Returns:
         str: The response from ChatGPT.
     """
-    # Set the OpenAI API key
-    openai.api_key = OPENAI_KEY
-    
     try:
-        # Make the API call to OpenAI
-        response = openai.ChatCompletion.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant for supply chain analysis."},
-                {"role": "user", "content": user_prompt},
-            ]
-        )
-        
-        # Extract the content of the assistant's response
-        return response['choices'][0]['message']['content'].strip()
+        return CHAT_CLIENT.stream(user_prompt, model=model, on_token=on_token)
     
     except Exception as e:
         return f"An error occurred: {e}"
 
+
 def main():
      user_input = input()
-     print(get_chatgpt_response(user_input))
+     # Print tokens as they arrive, then the latency of the call
+     response = get_chatgpt_response(user_input, on_token=lambda token: print(token, end="", flush=True))
+     call = CHAT_CLIENT.calls[-1]
+     if call["cached"]:
+          print("\n\n(cached response)")
+          return
+     if call["error"]:
+          print(response)
+     else:
+          print(f"\n\n(first token {call['ttft_seconds'] or 0:.2f} s, total {call['latency_seconds']:.2f} s)")
     
 if __name__ == "__main__":
      main()
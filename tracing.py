@@ -0,0 +1,209 @@
+import atexit
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from conn_config import config_dict as cfg
+
+
+TRACE_PATH = cfg["trace_path"] or os.path.join(tempfile.gettempdir(), "scm_demo_traces.jsonl")
+TRACE_EXPORT = cfg["trace_export"]
+HISTORY_SIZE = cfg["trace_history_size"]
+SERVICE_NAME = "scm_demo"
+
+# Attributes child spans copy from their parent, so a query span carries its Analyst request id
+INHERITED = ("request_id",)
+
+
+class Span:
+    """A timed operation with attributes, part of a trace."""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.parent: Optional[Span] = None
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        # Time spent in Tracer.outside blocks while the span was open
+        self.outside_ns = 0
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+
+    @property
+    def seconds(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns - self.outside_ns) / 1e9
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # OTLP/JSON encodes 64-bit integers as strings
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_span(span: Span) -> Dict[str, Any]:
+    """Encodes a finished span in the OTLP/JSON span format."""
+    encoded = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+    }
+    if span.parent_id:
+        encoded["parentSpanId"] = span.parent_id
+    return encoded
+
+
+class OtlpFileExporter:
+    """Appends spans to a file as OTLP/JSON export requests, one per line.
+
+    This is the layout the OpenTelemetry Collector's otlpjsonfile receiver
+    reads. Spans are buffered and written when a trace's root span ends.
+    """
+
+    def __init__(self, path: str = TRACE_PATH, max_buffered: int = 256) -> None:
+        self.path = path
+        self.max_buffered = max_buffered
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._buffer.append(otlp_span(span))
+            full = len(self._buffer) >= self.max_buffered
+        if span.parent_id is None or full:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+            if not spans:
+                return
+            request = {
+                "resourceSpans": [
+                    {
+                        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                        "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": spans}],
+                    }
+                ]
+            }
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(request, separators=(",", ":")) + "\n")
+
+
+class Tracer:
+    """Records nested spans around the stages of a request.
+
+    The current span is tracked per thread and per asyncio task, so spans
+    opened inside another span become its children. Finished spans go to
+    the exporter and into a rolling window that stats() summarizes.
+    """
+
+    def __init__(self, exporter: Optional[OtlpFileExporter] = None, history_size: int = HISTORY_SIZE) -> None:
+        self.exporter = exporter
+        self._current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+        self._lock = threading.Lock()
+        self.finished: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Times the block as a span, a child of the current span if there is one."""
+        parent = self._current.get()
+        inherited = {key: parent.attributes[key] for key in INHERITED if parent and key in parent.attributes}
+        span = Span(
+            name,
+            parent.trace_id if parent else secrets.token_hex(16),
+            parent.span_id if parent else None,
+            inherited,
+        )
+        span.parent = parent
+        span.set(**attributes)
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._current.reset(token)
+            span.end_ns = time.time_ns()
+            self._finish(span)
+
+    @contextmanager
+    def outside(self, span: Span) -> Iterator[None]:
+        """Runs the block under a span's parent, for work done while the span is open but not part of it.
+
+        The span's inherited attributes are copied to the parent, so spans
+        opened in the block still carry the request id. The block's time is
+        left out of the span's latency.
+        """
+        if span.parent is not None:
+            span.parent.set(**{key: span.attributes[key] for key in INHERITED if key in span.attributes})
+        token = self._current.set(span.parent)
+        start = time.time_ns()
+        try:
+            yield
+        finally:
+            self._current.reset(token)
+            span.outside_ns += time.time_ns() - start
+            span.set(outside_seconds=span.outside_ns / 1e9)
+
+    def annotate(self, **attributes: Any) -> None:
+        """Sets attributes on the current span, if any."""
+        span = self._current.get()
+        if span is not None:
+            span.set(**attributes)
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            self.finished.append({"name": span.name, "seconds": span.seconds, "error": span.error is not None})
+        if self.exporter is not None:
+            self.exporter.export(span)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Returns count, errors and p50/p95 latency per span name over the recent spans."""
+        with self._lock:
+            finished = list(self.finished)
+        by_name: Dict[str, List[Dict[str, Any]]] = {}
+        for record in finished:
+            by_name.setdefault(record["name"], []).append(record)
+
+        def percentile(values: list, q: float) -> float:
+            return values[min(len(values) - 1, int(q * len(values)))]
+
+        stats = {}
+        for name, records in by_name.items():
+            seconds = sorted(record["seconds"] for record in records)
+            stats[name] = {
+                "count": len(records),
+                "errors": sum(1 for record in records if record["error"]),
+                "p50_seconds": percentile(seconds, 0.50),
+                "p95_seconds": percentile(seconds, 0.95),
+            }
+        return stats
+
+
+# Shared by every session served from this process
+TRACER = Tracer(OtlpFileExporter() if TRACE_EXPORT else None)
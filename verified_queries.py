@@ -0,0 +1,188 @@
+import threading
+import time
+from difflib import SequenceMatcher
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from analyst_client import ANALYST_CLIENT
+from conn_config import config_dict as cfg
+from semantic_model import load_semantic_model, physical_sql, semantic_model_version, verified_queries
+from sql_templates import MONTHS, TemplateIndex, meaning_words, normalize_question, synonyms
+
+
+MATCH_THRESHOLD = cfg["verified_query_threshold"]
+# Words that pick a different answer from otherwise identical wording, mapped to what they ask for
+MODIFIERS = {
+    **dict.fromkeys("highest max maximum top most largest biggest greatest peak best".split(), "max"),
+    **dict.fromkeys("lowest min minimum bottom least smallest fewest worst".split(), "min"),
+    **dict.fromkeys("average avg mean".split(), "avg"),
+    **dict.fromkeys("cumulative running".split(), "cumulative"),
+    **dict.fromkeys("not no without excluding except".split(), "not"),
+}
+
+
+def literals(
+    question: str, values: Set[str] = frozenset(), measures: Optional[Dict[str, str]] = None
+) -> Set[str]:
+    """Returns the words of a normalized question that change its meaning.
+
+    These are numbers, months, dimension values and modifiers such as
+    highest/lowest or not. Given the measure synonyms of the semantic model
+    (see synonyms), the measures and time grains the question names count
+    as well.
+    """
+    found = set()
+    for word in question.split():
+        if word.isdigit() or word in values:
+            found.add(word)
+        elif word in MONTHS:
+            found.add(f"month{MONTHS[word]}")
+        elif word in MODIFIERS:
+            found.add(f"modifier:{MODIFIERS[word]}")
+    if measures is not None:
+        found |= meaning_words(question, measures)
+    return found
+
+
+def match_score(
+    question: str, candidate: str, values: Set[str] = frozenset(), measures: Optional[Dict[str, str]] = None
+) -> float:
+    """Scores two normalized questions from 0 to 1, tolerant of typos and word order.
+
+    Questions that differ in a literal (a year, a month, a dimension value, a
+    modifier or, given measure synonyms, a measure or time grain) score 0,
+    however similar the rest of the wording is.
+    """
+    if literals(question, values, measures) != literals(candidate, values, measures):
+        return 0.0
+    in_order = SequenceMatcher(None, question, candidate).ratio()
+    sorted_words = SequenceMatcher(None, " ".join(sorted(question.split())), " ".join(sorted(candidate.split()))).ratio()
+    return max(in_order, sorted_words)
+
+
+def _expected_analyst_seconds() -> float:
+    stats = ANALYST_CLIENT.stats()
+    return stats["p50_seconds"] if stats["calls"] else 0.0
+
+
+class VerifiedQueryMatcher:
+    """Answers questions that match a verified query of the semantic model without calling the Analyst.
+
+    The verified queries are indexed when the matcher is created and again
+    whenever the semantic model changes. A question matches when its fuzzy
+    score against a verified question reaches the threshold. Otherwise the
+    question is tried against SQL templates mined from the verified queries,
+    filling their date range and dimension slots from the question. The SQL
+    is rewritten to run on the base tables. Each hit records the Analyst
+    latency it saved, estimated as the median of recent Analyst calls.
+    """
+
+    def __init__(
+        self,
+        threshold: float = MATCH_THRESHOLD,
+        expected_seconds: Callable[[], float] = _expected_analyst_seconds,
+    ) -> None:
+        self.threshold = threshold
+        self._expected_seconds = expected_seconds
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._index: List[Dict[str, Any]] = []
+        self._values: Set[str] = set()
+        self._synonyms: Dict[str, str] = {}
+        self._templates: Optional[TemplateIndex] = None
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def _load(self) -> List[Dict[str, Any]]:
+        version = semantic_model_version()
+        with self._lock:
+            if version != self._version:
+                self._index = [
+                    {
+                        "name": query.get("name", query["question"]),
+                        "question": query["question"],
+                        "normalized": normalize_question(query["question"]),
+                        "sql": physical_sql(query["sql"]),
+                    }
+                    for query in verified_queries()
+                    if query.get("question") and query.get("sql")
+                ]
+                self._values = {
+                    word
+                    for table in load_semantic_model().get("tables", [])
+                    for dimension in table.get("dimensions", [])
+                    for value in dimension.get("sample_values", [])
+                    for word in normalize_question(str(value)).split()
+                }
+                self._synonyms = synonyms()
+                self._templates = TemplateIndex()
+                self._version = version
+            return self._index
+
+    def match(self, question: str) -> Optional[Dict[str, Any]]:
+        """Returns the best verified query for a question if it scores above the threshold.
+
+        The returned dict holds name, question, sql, score, match_seconds and
+        saved_seconds (the expected Analyst latency avoided), plus the slot
+        values for template matches.
+        """
+        start = time.perf_counter()
+        normalized = normalize_question(question)
+        best, best_score = None, 0.0
+        for query in self._load():
+            score = match_score(normalized, query["normalized"], self._values, self._synonyms)
+            if score > best_score:
+                best, best_score = query, score
+
+        if best is not None and best_score >= self.threshold:
+            found = {"name": best["name"], "question": best["question"], "sql": best["sql"], "score": best_score}
+        else:
+            found = self._templates.match(question, self.threshold)
+            if found is None:
+                with self._lock:
+                    self.misses += 1
+                return None
+            found = {**found, "question": question, "sql": physical_sql(found["sql"])}
+
+        match_seconds = time.perf_counter() - start
+        saved = max(self._expected_seconds() - match_seconds, 0.0)
+        with self._lock:
+            self.hits += 1
+            self.saved_seconds += saved
+        return {**found, "match_seconds": match_seconds, "saved_seconds": saved}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "saved_seconds": self.saved_seconds}
+
+
+def _answer_text(match: Dict[str, Any]) -> str:
+    if "slots" not in match:
+        return f"This is the verified answer to \"{match['question']}\"."
+    filled = []
+    for slot, value in match["slots"].items():
+        if slot == "date_range":
+            filled.append(f"{value[0].isoformat()} to {value[1].isoformat()}")
+        else:
+            filled.append(f"{slot.replace('_', ' ')} {value}")
+    return f"This answer uses the verified query \"{match['name']}\" for {', '.join(filled)}."
+
+
+def verified_response(match: Dict[str, Any]) -> Dict[str, Any]:
+    """Builds an Analyst-shaped response for a verified query match, like render_stream returns."""
+    return {
+        "message": {
+            "role": "analyst",
+            "content": [
+                {"type": "text", "text": _answer_text(match)},
+                {"type": "sql", "statement": match["sql"]},
+            ],
+        },
+        "request_id": None,
+        "timings": {"ttft_seconds": match["match_seconds"], "ttfr_seconds": match["match_seconds"]},
+        "verified_query": match["name"],
+    }
+
+
+# Shared by every session served from this process
+VERIFIED_QUERIES = VerifiedQueryMatcher()